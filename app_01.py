@@ -6,15 +6,18 @@ from dotenv import load_dotenv
 from streamlit.components.v1 import html as st_html
 from openai import OpenAI
 import json
-import re
+import time
 from io import BytesIO
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturoTimeout
 import networkx as nx
 from itertools import combinations
-import qdrant_client
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
 import base64
+import hashlib
+
+from tokenizador_pt import STOPWORDS_PT, tokenizar
 
 # cleaned imports: SequenceMatcher and base64 are stdlib, network/pyvis/wordcloud optional
 try:
@@ -44,6 +47,24 @@ except Exception:
     Network = None
     _GRAPH_AVAILABLE = False
 
+# motor vetorizado de coocorrências (numpy + scipy.sparse)
+try:
+    import grafo_palavras
+
+    _SPARSE_GRAPH_AVAILABLE = True
+except Exception:
+    grafo_palavras = None
+    _SPARSE_GRAPH_AVAILABLE = False
+
+# estatísticas de vocabulário com memória fixa (Count-Min + Space-Saving)
+try:
+    from vocabulario_sketch import TopKVocabulario
+
+    _SKETCH_AVAILABLE = True
+except Exception:
+    TopKVocabulario = None
+    _SKETCH_AVAILABLE = False
+
 # Carrega variáveis do .env
 load_dotenv()
 
@@ -55,6 +76,15 @@ load_dotenv()
 # ╚════════════════════════════════════════════════════════════════╝
 
 def get_qdrant_client():
+    # Modo embutido (QDRANT_MODE=local|memory): Qdrant no próprio processo, sem container
+    qdrant_mode = os.getenv("QDRANT_MODE", "server").lower()
+    if qdrant_mode in ("local", "memory"):
+        from rag.rag_module import create_qdrant_client
+
+        client = create_qdrant_client(qdrant_mode)
+        client.get_collections()
+        return client
+
     # Configuração para diferentes ambientes
     qdrant_host = os.getenv("QDRANT_HOST", "localhost")
     qdrant_port = int(os.getenv("QDRANT_PORT", 6333))
@@ -82,21 +112,45 @@ def get_qdrant_client():
         
         raise Exception(f"Could not connect to Qdrant. Tried {qdrant_host}:{qdrant_port}")
 
-def ensure_qdrant_collection(client, collection_name="rag_collection", vector_size=768):
-    collections = client.get_collections()
-    if collection_name not in [c.name for c in collections.collections]:
-        client.create_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
-        )
+# ═══════════════════════════════════════════════════════
+# Recursos compartilhados (um por processo, sobrevivem aos reruns)
+# ═══════════════════════════════════════════════════════
+# O Streamlit reexecuta o script inteiro a cada interação; com st.cache_resource
+# cliente Qdrant, modelo de embeddings, instância RAG e cliente OpenAI são
+# criados uma única vez. O `validate` funciona como health check: se o recurso
+# não responder, ele é recriado no próximo rerun.
+
+def _qdrant_saudavel(conexao) -> bool:
+    client, _ = conexao
+    if client is None:
+        # Falha fica em cache: não reconecta a cada rerun (o RAG tenta voltar
+        # ao Qdrant sozinho, a cada vector_store_retry_seconds)
+        return True
+    try:
+        client.get_collections()
+        return True
+    except Exception:
+        return False
+
+
+@st.cache_resource(show_spinner="🔌 Conectando ao Qdrant...", validate=_qdrant_saudavel)
+def get_shared_qdrant_client():
+    """(cliente, None) ou (None, erro): exceções não ficariam em cache."""
+    # A coleção é criada pelo RAG (QdrantStore.ensure) com a dimensão do modelo
+    try:
+        return get_qdrant_client(), None
+    except Exception as e:
+        return None, str(e)
 
-# Inicialização direta no Streamlit
-try:
-    qdrant_client = get_qdrant_client()
-    ensure_qdrant_collection(qdrant_client)
-except Exception as e:
-    st.sidebar.error(f"Erro ao inicializar Qdrant: {e}")
-    st.stop()
+
+# Com RAG_VECTOR_STORE=numpy o Qdrant não é usado; se ele estiver fora do ar,
+# o RAG segue em modo degradado (busca local NumPy, ver rag/rag_store.py)
+_QDRANT_HABILITADO = os.getenv("RAG_VECTOR_STORE", "qdrant").lower() != "numpy"
+cliente_qdrant = None
+if _QDRANT_HABILITADO:
+    cliente_qdrant, _erro_qdrant = get_shared_qdrant_client()
+    if cliente_qdrant is None:
+        st.sidebar.warning(f"Qdrant indisponível: {_erro_qdrant}. RAG em modo local (NumPy).")
 
 # ********####
 # from qdrant_client import QdrantClient
@@ -150,15 +204,41 @@ except Exception as e:
     def format_rag_context(docs):
         return ""
 
+# Em modo degradado (NumPy por falha do Qdrant) o health_check não descarta a
+# instância: ela mesma tenta voltar ao Qdrant a cada vector_store_retry_seconds,
+# numa thread em segundo plano (o validate não bloqueia o rerun)
+@st.cache_resource(
+    show_spinner="🔧 Inicializando sistema RAG...",
+    validate=lambda rag: rag.health_check(),
+)
+def get_rag_instance(knowledge_base_dir: str):
+    """
+    Instância RAG única por processo (modelo carregado e base indexada uma vez).
+    Falhas levantam exceção para não ficarem em cache.
+    """
+    print("🔧 Initializing RAG instance...")
+    client = None
+    if _QDRANT_HABILITADO:
+        client, erro = get_shared_qdrant_client()
+        if client is None:
+            print(f"⚠️ Qdrant indisponível para o RAG: {erro}")
+    rag = create_rag_instance(
+        knowledge_base_dir=knowledge_base_dir,
+        verbose=False,
+        client=client,
+    )
+    if rag is None:
+        raise RuntimeError("create_rag_instance não retornou instância")
+    print(f"✅ RAG initialized successfully with {rag.count()} documents")
+    return rag
+
+
 # Inicializa RAG se disponível
 if _RAG_AVAILABLE and RAG_CONFIG.get("enabled", False):
     try:
-        print("🔧 Initializing RAG instance...")
-        rag_instance = create_rag_instance(
-            knowledge_base_dir=RAG_CONFIG.get("knowledge_base_dir", "./rag/base_conhecimento"),
-            verbose=False
+        rag_instance = get_rag_instance(
+            RAG_CONFIG.get("knowledge_base_dir", "./rag/base_conhecimento")
         )
-        print(f"✅ RAG initialized successfully with {rag_instance.count()} documents")
     except Exception as e:
         print(f"❌ Failed to initialize RAG: {e}")
         rag_instance = None
@@ -238,6 +318,25 @@ CONFIG = {
     "modelo_padrao": os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
     "temperatura_padrao": 0.2,
     "max_contexto_rag": 3,  # Mantido para compatibilidade futura,
+    "streaming_habilitado": True,  # Renderiza a resposta token a token
+    # Backend de sentimento (padrão "llm"; o modelo local é opt-in):
+    # "llm" = OpenAI a cada mensagem | "local" = classificador em processo
+    # "hibrido" = local, com OpenAI apenas quando a confiança local for baixa
+    # O local só é confiável com embeddings multilíngues e um SENTIMENTO_DATASET
+    # com exemplos reais do atendimento (ver sentimento_local.py)
+    "sentimento_backend": os.getenv("SENTIMENTO_BACKEND", "llm"),
+    "sentimento_limiar_confianca": 0.6,
+    "sentimento_dataset": os.getenv("SENTIMENTO_DATASET"),  # .jsonl opcional com exemplos extras
+    "sentimento_timeout_s": 10.0,  # limite da chamada ao LLM (e da espera pelo resultado)
+    "sentimento_workers": 4,  # pool próprio: sentimento lento não atrasa outras etapas
+    # Grafo de palavras: orçamento de renderização (cada "Mostrar mais" soma mais um)
+    "grafo_max_nos": 80,
+    "grafo_max_arestas": 200,
+    "grafo_layout_servidor": True,  # posições calculadas em Python, física do vis.js desligada
+    # Vocabulário agregado (sketch): top-K palavras com erro <= epsilon * total, prob. 1 - delta
+    "vocab_sketch_k": 200,
+    "vocab_sketch_epsilon": 0.001,
+    "vocab_sketch_delta": 0.01,
 }
 
 modelo = CONFIG.get("modelo_padrao", "gpt-4.1-mini")
@@ -253,36 +352,43 @@ if not OPENAI_API_KEY:
     st.error("OPENAI_API_KEY não encontrada. Defina no ambiente (ex.: arquivo .env).")
     st.stop()
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-# def _is_nano(model_name: str) -> bool:
-#     return "nano" in (model_name or "").lower()
+@st.cache_resource
+def get_openai_client(api_key: str) -> OpenAI:
+    # Um cliente (e pool de conexões HTTP) por processo
+    return OpenAI(api_key=api_key)
+
+
+openai_client = get_openai_client(OPENAI_API_KEY)
+
+
+@st.cache_resource(show_spinner="🧠 Preparando classificador de sentimento local...")
+def get_classificador_sentimento():
+    """Classificador local, treinado uma vez por processo sobre o modelo de embeddings do RAG."""
+    from sentimento_local import ClassificadorSentimentoLocal
+
+    if rag_instance is not None:
+        embedding_model = rag_instance.embedding_model
+    else:
+        from rag.rag_module import get_embedding_model
+
+        embedding_model = get_embedding_model(
+            os.getenv("RAG_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        )
+    return ClassificadorSentimentoLocal(
+        embedding_model, caminho_dataset=CONFIG.get("sentimento_dataset")
+    )
 
 
-# SUGESTÃO DE CÓDIGO PARA CRIAR O CACHE:
-# CASO NÃO FUNCIONE, REMOVER ESSE TRECHO!!!
-# @st.cache_resource
-# def get_rag_instance():
-#     """
-#     Carrega a instância RAG uma única vez e a armazena em cache.
-#     """
-#     if not _RAG_AVAILABLE or not RAG_CONFIG.get("enabled", False):
-#         return None
-#     try:
-#         # Este spinner só aparecerá na *primeira* carga do app
-#         with st.spinner("🔧 Inicializando sistema RAG (cache)..."):
-#             rag_instance = create_rag_instance(
-#                 knowledge_base_dir=RAG_CONFIG.get("knowledge_base_dir", "./base_conhecimento"),
-#                 verbose=False
-#             )
-#             return rag_instance
-#     except Exception as e:
-#         # Se falhar, mostrará o erro na sidebar
-#         st.sidebar.error(f"Falha ao inicializar RAG: {e}")
-#         return None
-
-# # Inicializa e obtém a instância RAG do cache
-# rag_instance = get_rag_instance()
+classificador_sentimento = None
+if CONFIG.get("sentimento_backend", "llm") in ("local", "hibrido"):
+    try:
+        classificador_sentimento = get_classificador_sentimento()
+    except Exception as e:
+        print(f"⚠️ Classificador de sentimento local indisponível, usando LLM: {e}")
+
+# def _is_nano(model_name: str) -> bool:
+#     return "nano" in (model_name or "").lower()
 
 
 def call_llm(
@@ -313,46 +419,99 @@ def call_llm(
     return (resp.choices[0].message.content or "").strip()
 
 
-def obter_mensagens_completas():
-    """Inclui o system message + contexto RAG no início da lista de mensagens"""
+def _parametros_rag():
+    """
+    Lê do session_state (thread do script) os parâmetros da busca RAG.
+    Retorna None quando o RAG está desligado ou não há mensagem do usuário.
+    """
+    if not (_RAG_AVAILABLE and rag_instance and st.session_state.get("rag_enabled", True)):
+        return None
+
+    # Pega últimas mensagens do usuário para contexto
+    user_messages = [
+        m["content"] for m in st.session_state["lista_mensagens"][-6:]
+        if m["role"] == "user"
+    ]
+    if not user_messages:
+        return None
+
+    return {
+        # Combina últimas mensagens como query
+        "query": " ".join(user_messages[-1:]),  # Últimas 2 mensagens
+        "top_k": st.session_state.get("rag_top_k", 3),
+        "score_threshold": st.session_state.get("rag_threshold", 0.5),
+        "category_filter": st.session_state.get("rag_category_filter"),
+    }
+
+
+def buscar_contexto_rag(params: dict) -> list:
+    """Busca documentos relevantes. Não acessa st.*, então pode rodar em outra thread."""
+    return rag_instance.retrieve(**params)
+
+
+def _cronometrado(func, *args, **kwargs):
+    """Executa func e devolve (resultado, duração em ms)."""
+    inicio = time.perf_counter()
+    resultado = func(*args, **kwargs)
+    return resultado, round((time.perf_counter() - inicio) * 1000)
+
+
+@st.cache_resource
+def get_executor_sentimento() -> ThreadPoolExecutor:
+    # Pool limitado só para o sentimento (round-trip OpenAI), compartilhado
+    # entre sessões; a busca RAG roda no próprio thread do script
+    return ThreadPoolExecutor(
+        max_workers=int(CONFIG.get("sentimento_workers", 4)), thread_name_prefix="sentimento"
+    )
+
+
+def novo_sketch_vocabulario():
+    """Sketch de vocabulário com os parâmetros do CONFIG."""
+    if not _SKETCH_AVAILABLE:
+        return None
+    return TopKVocabulario(
+        k=CONFIG.get("vocab_sketch_k", 200),
+        epsilon=CONFIG.get("vocab_sketch_epsilon", 0.001),
+        delta=CONFIG.get("vocab_sketch_delta", 0.01),
+    )
+
+
+@st.cache_resource
+def get_vocabulario_global():
+    # Agregado de todas as sessões do processo; memória fixa, independente do volume
+    return novo_sketch_vocabulario()
+
+
+def obter_mensagens_completas(docs_rag=None, buscar_rag: bool = True):
+    """
+    Inclui o system message + contexto RAG no início da lista de mensagens.
+    `docs_rag` permite passar documentos já buscados (ex.: em paralelo);
+    com buscar_rag=True e sem docs, a busca é feita aqui.
+    """
     system_msg = {"role": "system", "content": prompt_sistema.strip()}
 
     # ═══════════════════════════════════════════════════════
     # INTEGRAÇÃO RAG - Busca contexto relevante automaticamente
     # ═══════════════════════════════════════════════════════
-    if _RAG_AVAILABLE and rag_instance and st.session_state.get("rag_enabled", True):
-        try:
-            # Pega últimas mensagens do usuário para contexto
-            user_messages = [
-                m["content"] for m in st.session_state["lista_mensagens"][-6:]
-                if m["role"] == "user"
-            ]
-
-            if user_messages:
-                # Combina últimas mensagens como query
-                query = " ".join(user_messages[-1:])  # Últimas 2 mensagens
-
-                # Busca documentos relevantes
-                category_filter = st.session_state.get("rag_category_filter")
-                docs = rag_instance.retrieve(
-                    query=query,
-                    top_k=st.session_state.get("rag_top_k", 3),
-                    score_threshold=st.session_state.get("rag_threshold", 0.5),
-                    category_filter=category_filter
-                )
+    if docs_rag is None and buscar_rag:
+        params = _parametros_rag()
+        if params:
+            try:
+                docs_rag = buscar_contexto_rag(params)
+            except Exception as e:
+                if st.session_state.get("rag_show_errors", False):
+                    st.sidebar.error(f"Erro no RAG: {e}")
 
-                if docs:
-                    # Formata contexto usando a função do config
-                    contexto_rag = format_rag_context(docs)
-                    system_msg["content"] += contexto_rag
+    if docs_rag is not None:
+        if docs_rag:
+            # Formata contexto usando a função do config
+            contexto_rag = format_rag_context(docs_rag)
+            system_msg["content"] += contexto_rag
 
-                    # Salva para exibir na UI
-                    st.session_state["ultimo_contexto_rag"] = docs
-                else:
-                    st.session_state["ultimo_contexto_rag"] = []
-        except Exception as e:
-            if st.session_state.get("rag_show_errors", False):
-                st.sidebar.error(f"Erro no RAG: {e}")
+            # Salva para exibir na UI
+            st.session_state["ultimo_contexto_rag"] = docs_rag
+        else:
+            st.session_state["ultimo_contexto_rag"] = []
 
     # codigo original (removido para evitar o erro junto a OpenAI - substituido pelo codigo abaixo)
     # return [system_msg] + st.session_state["lista_mensagens"]
@@ -368,6 +527,32 @@ def obter_mensagens_completas():
     return [system_msg] + api_messages
 
 
+def gerar_resposta_stream(messages, metricas: dict):
+    """
+    Gera os pedaços de texto da resposta conforme chegam da API (stream=True).
+    Preenche `metricas` com ttft_ms (tempo até o primeiro token) e total_ms.
+    """
+    inicio = time.perf_counter()
+    stream = openai_client.chat.completions.create(
+        model=modelo,
+        messages=messages,
+        temperature=temperatura,
+        max_tokens=max_tokens,
+        top_p=0.9,
+        frequency_penalty=0.1,
+        stream=True,
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if "ttft_ms" not in metricas:
+                metricas["ttft_ms"] = round((time.perf_counter() - inicio) * 1000)
+            yield delta
+    metricas["total_ms"] = round((time.perf_counter() - inicio) * 1000)
+
+
 # ═══════════════════════════════════════════════════════
 # CONFIGURAÇÃO INICIAL
 # ═══════════════════════════════════════════════════════
@@ -424,6 +609,23 @@ def _formatar_prompt_sentimento(texto: str) -> str:
 
 
 def analisar_sentimento(texto: str, modelo_sentimento: str):
+    """
+    Classifica o sentimento conforme CONFIG["sentimento_backend"].
+    No modo "hibrido", o LLM só é chamado se a confiança local for baixa.
+    """
+    backend = CONFIG.get("sentimento_backend", "llm")
+    if backend in ("local", "hibrido") and classificador_sentimento is not None:
+        try:
+            resultado = classificador_sentimento.classificar(texto)
+            limiar = float(CONFIG.get("sentimento_limiar_confianca", 0.6))
+            if backend == "local" or resultado["confidence"] >= limiar:
+                return resultado
+        except Exception as e:
+            print(f"⚠️ Falha no classificador local: {e}")
+    return _analisar_sentimento_llm(texto, modelo_sentimento)
+
+
+def _analisar_sentimento_llm(texto: str, modelo_sentimento: str):
     # Por que: mantemos consistência de qualidade centralizando no modelo.
     try:
         resp = openai_client.chat.completions.create(
@@ -435,6 +637,7 @@ def analisar_sentimento(texto: str, modelo_sentimento: str):
             temperature=0.0,
             max_tokens=150,
             top_p=0.0,
+            timeout=float(CONFIG.get("sentimento_timeout_s", 10.0)),
         )
         raw = resp.choices[0].message.content.strip()
         data = json.loads(raw)
@@ -480,131 +683,45 @@ def _score_from_label(label: str, confidence: float) -> float:
 # Tokenização PT-BR (WordCloud + Grafo)
 # ──────────────────────────────────────────────────────────────
 
-_PT_STOPWORDS = {
-    "a",
-    "à",
-    "às",
-    "ao",
-    "aos",
-    "as",
-    "o",
-    "os",
-    "um",
-    "uma",
-    "uns",
-    "umas",
-    "de",
-    "da",
-    "do",
-    "das",
-    "dos",
-    "dá",
-    "dão",
-    "em",
-    "no",
-    "na",
-    "nos",
-    "nas",
-    "por",
-    "para",
-    "pra",
-    "com",
-    "sem",
-    "entre",
-    "sobre",
-    "sob",
-    "até",
-    "após",
-    "que",
-    "se",
-    "é",
-    "ser",
-    "são",
-    "era",
-    "eram",
-    "foi",
-    "fui",
-    "vai",
-    "vou",
-    "e",
-    "ou",
-    "mas",
-    "como",
-    "quando",
-    "onde",
-    "qual",
-    "quais",
-    "porque",
-    "porquê",
-    "já",
-    "não",
-    "sim",
-    "também",
-    "mais",
-    "menos",
-    "muito",
-    "muita",
-    "muitos",
-    "muitas",
-    "meu",
-    "minha",
-    "meus",
-    "minhas",
-    "seu",
-    "sua",
-    "seus",
-    "suas",
-    "depois",
-    "antes",
-    "este",
-    "esta",
-    "estes",
-    "estas",
-    "isso",
-    "isto",
-    "aquele",
-    "aquela",
-    "aqueles",
-    "aquelas",
-    "lhe",
-    "lhes",
-    "ele",
-    "ela",
-    "eles",
-    "elas",
-    "você",
-    "vocês",
-    "nós",
-    "nosso",
-    "nossa",
-    "nossos",
-    "nossas",
-}
+# Stopwords e regex ficam em tokenizador_pt.py (frozenset + padrão pré-compilado)
+_PT_STOPWORDS = STOPWORDS_PT
 
 
 def tokenize_pt(texto: str):
     # Por que: reduzir ruído, focar termos relevantes para WordCloud/Grafo.
-    texto = texto.lower()
-    tokens = re.findall(r"[a-zA-ZÀ-ÿ]+", texto)
-    tokens = [t for t in tokens if len(t) >= 3 and t not in _PT_STOPWORDS]
-    return tokens
+    return tokenizar(texto)
+
 
+# Nº de palavras desenhadas na nuvem (mesmo padrão do WordCloud)
+WORDCLOUD_TOP_K = 200
 
-def gerar_wordcloud(corpus_text: str, width: int = 450, height: int = 280):
+
+def gerar_wordcloud(frequencias: Counter, width: int = 450, height: int = 280):
     # Por que: visão rápida dos temas recorrentes.
-    if not corpus_text.strip():
+    # Usa só o top-K das frequências; o PNG fica em cache para o mesmo top-K.
+    if not frequencias:
         return None, "Digite algo para iniciar a nuvem de palavras."
     if not _WORDCLOUD_AVAILABLE:
         return None, "Pacote 'wordcloud' não encontrado. Instale: pip install wordcloud"
+    top = tuple(frequencias.most_common(WORDCLOUD_TOP_K))
+    return _wordcloud_png(top, width, height), None
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _wordcloud_png(top_frequencias: tuple, width: int, height: int) -> bytes:
+    """Rasteriza a nuvem a partir de ((palavra, freq), ...) e devolve os bytes do PNG."""
     wc = WordCloud(
-        width=width, height=height, background_color="white", collocations=False
+        width=width,
+        height=height,
+        background_color="white",
+        collocations=False,
+        max_words=WORDCLOUD_TOP_K,
     )
-    wc.generate(corpus_text)
+    wc.generate_from_frequencies(dict(top_frequencias))
     img = wc.to_image()
     buf = BytesIO()
     img.save(buf, format="PNG")
-    buf.seek(0)
-    return buf, None
+    return buf.getvalue()
 
 
 # ═══════════════════════════════════════════════════════
@@ -620,19 +737,25 @@ def build_cooc_graph(
       - window_k = -1  => todos os pares dentro da mesma mensagem (mais denso)
       - window_k = 2..10 => pares dentro de uma janela deslizante de k tokens (mais conservador)
     Filtra arestas com peso < min_edge_weight.
+
+    Usa o motor esparso (grafo_palavras) quando numpy/scipy estão disponíveis.
     """
+    if _SPARSE_GRAPH_AVAILABLE:
+        return grafo_palavras.grafo_coocorrencia(
+            token_sequences, window_k=window_k, min_edge_weight=min_edge_weight
+        )
+
     G = nx.Graph()
 
     for tokens in token_sequences:
-        if not tokens or len(tokens) < 2:
-            # ainda conta frequência do nó (para dimensionar)
-            for t in tokens:
-                G.nodes[t]["count"] = G.nodes.get(t, {}).get("count", 0) + 1
-            continue
-
-        # conta nós
+        # conta nós (inclusive mensagens com 1 token, para dimensionar)
         for t in tokens:
-            G.nodes[t]["count"] = G.nodes.get(t, {}).get("count", 0) + 1
+            if t in G:
+                G.nodes[t]["count"] = G.nodes[t].get("count", 0) + 1
+            else:
+                G.add_node(t, count=1)
+        if len(tokens) < 2:
+            continue
 
         # escolhe pares
         if window_k == -1:
@@ -673,28 +796,70 @@ def build_word_graph(token_sequences, min_edge_weight: int = 1):
     if not _GRAPH_AVAILABLE:
         return None
 
-    G = nx.Graph()
-    node_counts = Counter()
-    edge_counts = Counter()
+    return grafo_de_contagens(
+        novas_contagens_grafo(token_sequences), min_edge_weight=min_edge_weight
+    )
 
+
+def novas_contagens_grafo(token_sequences=()) -> dict:
+    """
+    Estado incremental do grafo de palavras (guardado por sessão):
+    - "nos": Counter de frequência por palavra;
+    - "arestas": Counter de bigramas (par ordenado);
+    - "versao": incrementa a cada atualização (invalida o grafo derivado).
+    """
+    contagens = {"nos": Counter(), "arestas": Counter(), "versao": 0}
     for seq in token_sequences:
-        node_counts.update(seq)  # conta ocorrências por palavra
-        for i in range(len(seq) - 1):
-            a, b = seq[i], seq[i + 1]
-            if a == b:
-                continue
-            edge = tuple(sorted((a, b)))
-            edge_counts[edge] += 1
+        atualizar_contagens_grafo(contagens, seq)
+    return contagens
+
+
+def atualizar_contagens_grafo(contagens: dict, tokens) -> None:
+    """Acumula apenas os tokens da nova mensagem (sem recontar o histórico)."""
+    contagens["nos"].update(tokens)
+    for a, b in zip(tokens, tokens[1:]):
+        if a == b:
+            continue
+        contagens["arestas"][tuple(sorted((a, b)))] += 1
+    contagens["versao"] += 1
+
+
+def grafo_de_contagens(contagens: dict, min_edge_weight: int = 1):
+    """Monta o grafo (nós com 'count', arestas com 'weight' >= mínimo) a partir das contagens."""
+    if not _GRAPH_AVAILABLE:
+        return None
 
+    G = nx.Graph()
     # adiciona nós com atributo de frequência
-    for w, c in node_counts.items():
+    for w, c in contagens["nos"].items():
         G.add_node(w, count=int(c))
 
     # adiciona arestas com peso mínimo
-    for (a, b), w in edge_counts.items():
-        if w >= max(1, int(min_edge_weight)):
-            G.add_edge(a, b, weight=int(w))
+    minimo = max(1, int(min_edge_weight))
+    G.add_edges_from(
+        (a, b, {"weight": int(w)})
+        for (a, b), w in contagens["arestas"].items()
+        if w >= minimo
+    )
+    return G
+
+
+def obter_grafo_sessao(min_edge_weight: int = 1):
+    """
+    Grafo de palavras da sessão. É derivado das contagens incrementais e
+    reaproveitado enquanto nem as contagens nem o filtro de aresta mudarem.
+    """
+    if "grafo_contagens" not in st.session_state:
+        st.session_state["grafo_contagens"] = novas_contagens_grafo()
+    contagens = st.session_state["grafo_contagens"]
 
+    chave = (contagens["versao"], int(min_edge_weight))
+    cache = st.session_state.get("grafo_derivado")
+    if cache and cache[0] == chave:
+        return cache[1]
+
+    G = grafo_de_contagens(contagens, min_edge_weight=min_edge_weight)
+    st.session_state["grafo_derivado"] = (chave, G)
     return G
 
 
@@ -703,34 +868,45 @@ def subgraph_paths_to_target(G, target: str, max_depth: int = 4):
     Extrai subgrafo contendo:
     - o alvo;
     - nós que possuem caminho até o alvo com comprimento <= max_depth.
+    Retorna uma visão (somente leitura) do grafo original, sem cópia.
     """
     if G is None or target not in G:
         return None
 
-    # BFS limitado para coletar nós que alcançam o alvo até max_depth
-    visited = {target}
-    frontier = {target}
-    depth = 0
-    while frontier and depth < max_depth:
-        next_frontier = set()
-        for u in frontier:
-            for v in G.neighbors(u):
-                if v not in visited:
-                    visited.add(v)
-                    next_frontier.add(v)
-        frontier = next_frontier
-        depth += 1
-
-    # cria subgrafo induzido
-    return G.subgraph(visited).copy()
+    if _SPARSE_GRAPH_AVAILABLE:
+        # BFS vetorizado sobre a adjacência CSR (calculada uma vez por grafo)
+        visited = grafo_palavras.nos_alcancaveis(G, target, max_depth=max_depth)
+    else:
+        # BFS limitado para coletar nós que alcançam o alvo até max_depth
+        visited = {target}
+        frontier = {target}
+        depth = 0
+        while frontier and depth < max_depth:
+            next_frontier = set()
+            for u in frontier:
+                for v in G.neighbors(u):
+                    if v not in visited:
+                        visited.add(v)
+                        next_frontier.add(v)
+            frontier = next_frontier
+            depth += 1
+
+    # visão do subgrafo induzido (a poda/renderização criam o grafo final)
+    return G.subgraph(visited)
 
 
 def render_graph_pyvis(
-    G, highlight_target: str = None, height_px: int = 600, dark_mode: bool = False
+    G,
+    highlight_target: str = None,
+    height_px: int = 600,
+    dark_mode: bool = False,
+    posicoes: dict = None,
 ):
     """
     Renderiza com PyVis (interativo). Dimensiona nós por frequência (log-scale) e arestas por peso.
     - `highlight_target` recebe cor especial para facilitar leitura.
+    - `posicoes` ({nó: (x, y)} em [-1, 1]): coordenadas fixas calculadas no servidor;
+      a física do vis.js é desligada e o navegador só desenha.
     """
     if not _GRAPH_AVAILABLE or G is None or len(G) == 0:
         return (
@@ -748,13 +924,18 @@ def render_graph_pyvis(
         notebook=False,
         directed=False,
     )
-    net.barnes_hut(
-        gravity=-2000,
-        central_gravity=0.3,
-        spring_length=160,
-        spring_strength=0.01,
-        damping=0.9,
-    )
+    if posicoes:
+        net.toggle_physics(False)
+        # espalha [-1, 1] em pixels proporcionalmente ao nº de nós
+        escala = 120 * max(2.0, len(G) ** 0.5)
+    else:
+        net.barnes_hut(
+            gravity=-2000,
+            central_gravity=0.3,
+            spring_length=160,
+            spring_strength=0.01,
+            damping=0.9,
+        )
 
     # normalizações de tamanho
     node_counts = nx.get_node_attributes(G, "count")
@@ -770,7 +951,14 @@ def render_graph_pyvis(
         color_norm = "#93c5fd" if dark_mode else "#60a5fa"
         color = color_high if node == highlight_target else color_norm
         title = f"{node}<br/>freq: {count}"
-        net.add_node(node, label=node, size=size, color=color, title=title)
+        if posicoes and node in posicoes:
+            x, y = posicoes[node]
+            net.add_node(
+                node, label=node, size=size, color=color, title=title,
+                x=x * escala, y=y * escala, physics=False,
+            )
+        else:
+            net.add_node(node, label=node, size=size, color=color, title=title)
 
     for u, v, data in G.edges(data=True):
         w = int(data.get("weight", 1))
@@ -781,6 +969,108 @@ def render_graph_pyvis(
     return net.generate_html(), None
 
 
+def impressao_grafo(G) -> str:
+    """Impressão digital do conteúdo do grafo (nós/frequências e arestas/pesos)."""
+    h = hashlib.sha1()
+    for node, count in sorted(G.nodes(data="count", default=1)):
+        h.update(f"n|{node}|{count}\n".encode("utf-8"))
+    for u, v, w in sorted(
+        (min(a, b), max(a, b), int(w)) for a, b, w in G.edges(data="weight", default=1)
+    ):
+        h.update(f"e|{u}|{v}|{w}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_graph_pyvis_cached(
+    impressao: str,
+    _G,
+    highlight_target: str = None,
+    height_px: int = 600,
+    dark_mode: bool = False,
+    layout_servidor: bool = False,
+    _pos_anterior: dict = None,
+):
+    """
+    HTML do PyVis memoizado por (impressão digital do grafo, alvo, modo escuro,
+    altura, layout no servidor). Parâmetros com prefixo _ não entram na chave.
+    Mantém no máximo 32 HTMLs em memória.
+
+    Com layout_servidor, calcula as posições aqui (warm start a partir de
+    `_pos_anterior`), de modo que o layout também fica em cache por grafo.
+    Retorna (html, erro, posições).
+    """
+    posicoes = None
+    if layout_servidor and _SPARSE_GRAPH_AVAILABLE:
+        posicoes = grafo_palavras.layout_grafo(_G, pos_anterior=_pos_anterior)
+    html, err = render_graph_pyvis(
+        _G,
+        highlight_target=highlight_target,
+        height_px=height_px,
+        dark_mode=dark_mode,
+        posicoes=posicoes,
+    )
+    return html, err, posicoes
+
+
+def obter_grafo_visao(
+    G_full,
+    target: str,
+    max_depth: int,
+    apenas_caminhos: bool,
+    max_nos: int = 80,
+    max_arestas: int = 200,
+    estrategia_poda: str = "frequencia",
+):
+    """
+    Grafo exibido (completo ou só caminhos até o alvo, podado ao orçamento de
+    nós/arestas) + sua impressão digital + nº de nós antes da poda.
+    Reaproveitado enquanto grafo e controles não mudarem.
+    Retorna (None, None, 0) quando não há caminhos dentro da profundidade.
+    """
+    chave = (
+        st.session_state.get("grafo_derivado", (None,))[0],
+        target,
+        int(max_depth),
+        bool(apenas_caminhos),
+        int(max_nos),
+        int(max_arestas),
+        estrategia_poda,
+    )
+    cache = st.session_state.get("grafo_visao")
+    if cache and cache[0] == chave:
+        return cache[1], cache[2], cache[3]
+
+    G_view = G_full
+    if apenas_caminhos and target:
+        G_view = subgraph_paths_to_target(G_full, target, max_depth=max_depth)
+    if G_view is None or len(G_view) == 0:
+        G_view, impressao, total_nos = None, None, 0
+    else:
+        total_nos = len(G_view)
+        # Poda: custo de renderização limitado, independente do tamanho da conversa
+        if _SPARSE_GRAPH_AVAILABLE:
+            G_view = grafo_palavras.podar_grafo(
+                G_view,
+                max_nos=max_nos,
+                max_arestas=max_arestas,
+                estrategia=estrategia_poda,
+                manter=[target] if target else [],
+            )
+        impressao = impressao_grafo(G_view)
+
+    st.session_state["grafo_visao"] = (chave, G_view, impressao, total_nos)
+    return G_view, impressao, total_nos
+
+
+def _grafo_mostrar_mais():
+    st.session_state["grafo_nivel_detalhe"] = st.session_state.get("grafo_nivel_detalhe", 0) + 1
+
+
+def _grafo_mostrar_menos():
+    st.session_state["grafo_nivel_detalhe"] = 0
+
+
 def show_grafo_modal():
     """Abre o grafo em tela cheia sem ocupar a área de diálogo.
     Usa st.dialog (ou experimental_dialog). Fallback: abrir em nova aba."""
@@ -826,14 +1116,20 @@ def show_grafo_modal():
 
 st.sidebar.title("⚙️ PAINEL DE CONTROLE")
 
+# Painéis da sidebar como fragmentos (st.fragment): interações dentro de um
+# painel reexecutam só ele, não o app inteiro (histórico do chat, outros painéis)
+fragmento = getattr(st, "fragment", None) or (lambda func: func)
+
 # ═══════════════════════════════════════════════════════
 # ─ RAG (Base de Conhecimento) – controles
 # ═══════════════════════════════════════════════════════
-# if rag_instance:
-if rag_instance:
-    st.sidebar.write("### 📚 Base de Conhecimento (RAG)")
 
-    col_rag1, col_rag2 = st.sidebar.columns(2)
+@fragmento
+def painel_rag():
+    """Controles do RAG: mexer nos filtros/sliders reexecuta só este painel."""
+    st.write("### 📚 Base de Conhecimento (RAG)")
+
+    col_rag1, col_rag2 = st.columns(2)
     with col_rag1:
         st.metric("Documentos", rag_instance.count())
     with col_rag2:
@@ -850,7 +1146,7 @@ if rag_instance:
         use_cases = get_active_use_cases()
         use_case_options = {uc["name"]: uc["key"] for uc in use_cases}
 
-        selected_use_case_name = st.sidebar.selectbox(
+        selected_use_case_name = st.selectbox(
             "Caso de uso:",
             options=list(use_case_options.keys()),
             help="Filtra a base de conhecimento por contexto"
@@ -863,7 +1159,7 @@ if rag_instance:
             st.session_state["rag_category_filter"] = use_case_config.get("category_filter")
 
     # Configurações avançadas (expander)
-    with st.sidebar.expander("⚙️ Configurações RAG"):
+    with st.expander("⚙️ Configurações RAG"):
         st.session_state["rag_top_k"] = st.slider(
             "Documentos retornados", 1, 5, 2,
             help="Quantos documentos usar como contexto"
@@ -876,13 +1172,13 @@ if rag_instance:
 
     # Mostra último contexto usado
     if st.session_state.get("ultimo_contexto_rag"):
-        with st.sidebar.expander("🔍 Contexto usado na última resposta"):
+        with st.expander("🔍 Contexto usado na última resposta"):
             for doc in st.session_state["ultimo_contexto_rag"]:
                 st.caption(f"**{doc['source']}** ({doc['score']:.1%})")
                 st.text(doc['text'][:150] + "...")
 
     # Botão para recarregar base
-    col_r1, col_r2 = st.sidebar.columns(2)
+    col_r1, col_r2 = st.columns(2)
     with col_r1:
         if st.button("🔄 Recarregar", width='stretch', key="rag_reload"):
             rag_instance.clear()
@@ -891,10 +1187,16 @@ if rag_instance:
             st.rerun()
     with col_r2:
         stats = rag_instance.get_stats()
+        stats["qdrant_saudavel"] = rag_instance.health_check()
         with st.popover("📊 Stats"):
             st.json(stats)
 
-    st.sidebar.write("---")
+    st.write("---")
+
+
+if rag_instance:
+    with st.sidebar:
+        painel_rag()
 
 # ─ Sentimento – controles mínimos
 st.sidebar.write("### 🧠 Análise de Sentimento")
@@ -931,35 +1233,17 @@ wc_container = st.sidebar.container()
 col_wc1, col_wc2 = st.sidebar.columns(2)
 with col_wc1:
     if st.button("🗑️ Limpar nuvem", width='stretch'):
-        st.session_state["user_corpus_text"] = ""
-        st.session_state["user_token_sequences"] = []
+        st.session_state["user_token_counts"] = Counter()
+        st.session_state["grafo_contagens"] = novas_contagens_grafo()
+        st.session_state.pop("grafo_derivado", None)
+        st.session_state.pop("grafo_visao", None)
         st.rerun()
 with col_wc2:
     st.caption("Atualiza ao enviar nova mensagem")
 
 # ─ Grafo de Palavras
 st.sidebar.write("### 🔗 Grafo de Palavras")
-graph_container = st.sidebar.container()
-
-# Controles do grafo (na lateral) — comentamos "o que faz" conforme pedido:
-with graph_container:
-    # Seleciona o mínimo de coocorrências exigido por aresta (filtra ruído)
-    min_edge_weight = st.slider(
-        "Mín. coocorrências (aresta)", 1, 5, 1, help="Filtra arestas fracas"
-    )
-    # Define a profundidade máxima para caminhos até o alvo (limita subgrafo)
-    max_path_depth = st.slider(
-        "Profundidade máx. caminho", 1, 8, 4, help="Caminhos até a palavra alvo"
-    )
-    # Alterna entre ver o grafo completo ou apenas caminhos que chegam ao alvo
-    show_paths_only = st.toggle(
-        "Mostrar apenas caminhos até a palavra alvo", value=True
-    )
-    # Modo escuro apenas para o grafo (melhor contraste)
-    graph_dark_mode = st.toggle(
-        "Modo escuro (grafo)", value=True, help="Apenas afeta o grafo interativo."
-    )
-    # Espaço para desenhar o grafo após calcularmos dados (abaixo, no pós-input)
+graph_container = st.sidebar.container()  # preenchido por painel_grafo() (fragmento), no fim do script
 
 st.sidebar.write("---")
 st.sidebar.write("### 🛠️ Ações")
@@ -968,9 +1252,12 @@ with col1:
     if st.button("Limpar chat", width='stretch'):
         st.session_state["lista_mensagens"] = []
         st.session_state["sentimento_atual"] = None
-        st.session_state["user_corpus_text"] = ""
-        st.session_state["user_token_sequences"] = []
+        st.session_state["user_token_counts"] = Counter()
+        st.session_state["grafo_contagens"] = novas_contagens_grafo()
+        st.session_state.pop("grafo_derivado", None)
+        st.session_state.pop("grafo_visao", None)
         st.session_state["sentiment_history"] = []
+        st.session_state["ultima_latencia"] = None
         st.rerun()
 with col2:
     if st.button("Recarregar", width='stretch'):
@@ -985,10 +1272,14 @@ if "lista_mensagens" not in st.session_state:
     st.session_state["lista_mensagens"] = []
 if "sentimento_atual" not in st.session_state:
     st.session_state["sentimento_atual"] = None
-if "user_corpus_text" not in st.session_state:
-    st.session_state["user_corpus_text"] = ""
-if "user_token_sequences" not in st.session_state:
-    st.session_state["user_token_sequences"] = []
+if "user_token_counts" not in st.session_state:
+    st.session_state["user_token_counts"] = Counter()  # frequência por palavra (WordCloud)
+if "grafo_contagens" not in st.session_state:
+    # Contagens incrementais do grafo; sessões antigas ainda guardavam a lista
+    # de sequências de tokens, consumida aqui uma única vez
+    st.session_state["grafo_contagens"] = novas_contagens_grafo(
+        st.session_state.pop("user_token_sequences", [])
+    )
 if "sentiment_history" not in st.session_state:
     st.session_state[
         "sentiment_history"
@@ -1014,6 +1305,20 @@ for msg in st.session_state["lista_mensagens"]:
         with st.expander("🔍 Contexto RAG utilizado"):
             st.text(msg["content"])
 
+# Latência da última resposta (registrada no streaming)
+_lat = st.session_state.get("ultima_latencia")
+if _lat and st.session_state["lista_mensagens"]:
+    _partes = [
+        f"Primeiro token: {_lat.get('ttft_ms', '?')} ms",
+        f"Resposta: {_lat.get('total_ms', '?')} ms",
+    ]
+    if "rag_ms" in _lat:
+        _partes.append(f"RAG: {_lat['rag_ms']} ms")
+    if "sentimento_ms" in _lat:
+        _partes.append(f"Sentimento: {_lat['sentimento_ms']} ms (paralelo)")
+    _partes.append(f"Turno: {_lat.get('turno_ms', '?')} ms")
+    st.caption("⏱️ " + " • ".join(_partes))
+
 # Entrada
 mensagem_usuario = st.chat_input("💭 Digite sua mensagem aqui...")
 
@@ -1021,24 +1326,104 @@ mensagem_usuario = st.chat_input("💭 Digite sua mensagem aqui...")
 # Ao receber mensagem: RAG + Sentimento + WordCloud + Grafo
 # ═══════════════════════════════════════════════════════
 if mensagem_usuario:
+    inicio_turno = time.perf_counter()
+    tempos = {}
+
     st.chat_message("user").write(mensagem_usuario)
     st.session_state["lista_mensagens"].append(
         {"role": "user", "content": mensagem_usuario}
     )
 
-    # Atualiza corpus (WordCloud): agrega tokens ao texto global
+    # Sentimento (round-trip OpenAI) roda em paralelo com RAG + resposta;
+    # só esperamos o resultado no fim do turno
+    fut_sentimento = None
+    if sentimento_habilitado:
+        fut_sentimento = get_executor_sentimento().submit(
+            _cronometrado, analisar_sentimento, mensagem_usuario, modelo_sentimento
+        )
+    params_rag = _parametros_rag()
+
+    # Atualiza frequências (WordCloud) só com os tokens da nova mensagem
     tokens = tokenize_pt(mensagem_usuario)
     if tokens:
-        st.session_state["user_corpus_text"] += " " + " ".join(tokens)
-        # Atualiza sequência de tokens desta mensagem (para grafo)
-        st.session_state["user_token_sequences"].append(tokens)
+        st.session_state["user_token_counts"].update(tokens)
+        # Sketch global: memória fixa para estatísticas de longo prazo (a sessão
+        # já tem contagens exatas em user_token_counts)
+        vocabulario_global = get_vocabulario_global()
+        if vocabulario_global is not None:
+            vocabulario_global.update(tokens)
+        # Grafo: acumula só os nós/bigramas da nova mensagem
+        atualizar_contagens_grafo(st.session_state["grafo_contagens"], tokens)
+
+    resposta_ok = False
+    with st.chat_message("assistant"):  # , avatar="🤖"):
+        try:
+            with st.spinner("🤔 Pensando na resposta..."):
+                # Busca RAG (embedding + Qdrant) no próprio thread: o resultado
+                # é necessário logo em seguida para montar as mensagens
+                docs_rag = None
+                if params_rag:
+                    try:
+                        docs_rag, tempos["rag_ms"] = _cronometrado(buscar_contexto_rag, params_rag)
+                    except Exception as e:
+                        if st.session_state.get("rag_show_errors", False):
+                            st.sidebar.error(f"Erro no RAG: {e}")
+                # Obtém mensagens completas (com o contexto RAG já buscado)
+                messages = obter_mensagens_completas(docs_rag, buscar_rag=False)
+
+            if config.get("streaming_habilitado", True):
+                # Tokens aparecem conforme chegam; write_stream devolve o texto final
+                metricas = {}
+                resposta_ia = st.write_stream(gerar_resposta_stream(messages, metricas))
+                if not isinstance(resposta_ia, str):
+                    resposta_ia = "".join(str(p) for p in resposta_ia)
+            else:
+                inicio = time.perf_counter()
+                with st.spinner("🤔 Pensando na resposta..."):
+                    resposta = openai_client.chat.completions.create(
+                        model=modelo,
+                        messages=messages,
+                        temperature=temperatura,
+                        max_tokens=max_tokens,
+                        top_p=0.9,
+                        frequency_penalty=0.1,
+                    )
+                resposta_ia = resposta.choices[0].message.content or ""
+                total_ms = round((time.perf_counter() - inicio) * 1000)
+                metricas = {"ttft_ms": total_ms, "total_ms": total_ms}
+                st.write(resposta_ia)
 
-    # Análise de sentimento
-    if sentimento_habilitado:
-        with st.spinner("🧠 Analisando sentimento..."):
-            st.session_state["sentimento_atual"] = analisar_sentimento(
-                mensagem_usuario, modelo_sentimento=modelo_sentimento
+            tempos.update(metricas)
+
+            st.session_state["lista_mensagens"].append(
+                {"role": "assistant", "content": resposta_ia}
+            )
+
+            # Salva contexto RAG junto com a mensagem para histórico (se disponível)
+            docs_rag = st.session_state.get("ultimo_contexto_rag", [])
+            if docs_rag and st.session_state.get("rag_enabled", True):
+                st.session_state["lista_mensagens"].append(
+                    {"role": "rag_context", "docs": docs_rag}
+                )
+            resposta_ok = True
+        except Exception as e:
+            st.error(f"❌ Erro na API: {str(e)}")
+
+    # Junta a análise de sentimento (rodou em paralelo com RAG + resposta)
+    if fut_sentimento is not None:
+        try:
+            st.session_state["sentimento_atual"], tempos["sentimento_ms"] = fut_sentimento.result(
+                timeout=float(CONFIG.get("sentimento_timeout_s", 10.0))
             )
+        except FuturoTimeout:
+            # Pool ocupado ou LLM lento: segue o turno sem travar a resposta
+            st.session_state["sentimento_atual"] = {
+                "label": "neutro",
+                "confidence": 0.0,
+                "emotions": [],
+                "reason": "Análise de sentimento excedeu o tempo limite",
+            }
+
     # --- acumula score por mensagem do usuário (após obter sentimento) ---
     _data = st.session_state.get("sentimento_atual")
     try:
@@ -1061,38 +1446,13 @@ if mensagem_usuario:
             }
         )
 
-    with st.chat_message("assistant"):  # , avatar="🤖"):
-        with st.spinner("🤔 Pensando na resposta..."):
-            try:
-                # Obtém mensagens completas (inclui busca RAG)
-                messages = obter_mensagens_completas()
-                
-                resposta = openai_client.chat.completions.create(
-                    model=modelo,
-                    messages=messages,
-                    temperature=temperatura,
-                    max_tokens=max_tokens,
-                    top_p=0.9,
-                    frequency_penalty=0.1,
-                )
-                resposta_ia = resposta.choices[0].message.content or ""
-                st.write(resposta_ia)
+    tempos["turno_ms"] = round((time.perf_counter() - inicio_turno) * 1000)
+    st.session_state["ultima_latencia"] = tempos
+    print("⏱️ Turno: " + " | ".join(f"{k}={v}" for k, v in tempos.items()))
 
-                st.session_state["lista_mensagens"].append(
-                    {"role": "assistant", "content": resposta_ia}
-                )
-
-                # Salva contexto RAG junto com a mensagem para histórico (se disponível)
-                docs_rag = st.session_state.get("ultimo_contexto_rag", [])
-                if docs_rag and st.session_state.get("rag_enabled", True):
-                    st.session_state["lista_mensagens"].append(
-                        {"role": "rag_context", "docs": docs_rag}
-                    )
-
-                # opcional: evita efeitos visuais residuais
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Erro na API: {str(e)}")
+    if resposta_ok:
+        # opcional: evita efeitos visuais residuais
+        st.rerun()
 
 
 # ─ Mostrar grafo na TELA PRINCIPAL quando o toggle estiver ligado
@@ -1123,9 +1483,10 @@ def _badge(label: str) -> str:
     )
 
 
-with sent_container:
+@fragmento
+def painel_sentimento(habilitado: bool):
     data = st.session_state.get("sentimento_atual")
-    if sentimento_habilitado and data:
+    if habilitado and data:
         st.markdown(_badge(data["label"]), unsafe_allow_html=True)
         st.metric("Confiança", f"{round(data['confidence'] * 100):d}%")
         if data["emotions"]:
@@ -1134,11 +1495,13 @@ with sent_container:
         if data.get("reason"):
             with st.expander("Por que o modelo decidiu isso?"):
                 st.write(data["reason"])
-    elif sentimento_habilitado:
+    elif habilitado:
         st.info("Envie uma mensagem para ver o sentimento aqui.")
 
-with wc_container:
-    buf, err = gerar_wordcloud(st.session_state.get("user_corpus_text", ""))
+
+@fragmento
+def painel_wordcloud():
+    buf, err = gerar_wordcloud(st.session_state.get("user_token_counts", Counter()))
     if err:
         st.info(err)
     elif buf:
@@ -1151,12 +1514,62 @@ with wc_container:
             width='stretch',
         )
 
-with graph_container:
-    # Calcula grafo a partir das sequências do usuário (aplica filtro de aresta)
-    G_full = build_word_graph(
-        st.session_state.get("user_token_sequences", []),
-        min_edge_weight=min_edge_weight,
+    vocabulario_global = get_vocabulario_global()
+    if vocabulario_global is not None and vocabulario_global.total:
+        with st.expander("🌐 Mais frequentes (todas as conversas)"):
+            stats = vocabulario_global.get_stats()
+            st.dataframe(
+                [{"palavra": p, "freq. estimada": f} for p, f in vocabulario_global.top(10)],
+                hide_index=True,
+                width='stretch',
+            )
+            st.caption(
+                f"{stats['total_tokens']} palavras · erro máx. ±{stats['erro_maximo']} "
+                f"({stats['confianca']:.0%} de confiança) · {stats['memoria_bytes'] // 1024} KB"
+            )
+
+
+@fragmento
+def painel_grafo():
+    """Controles + grafo: mudar filtros ou a palavra alvo reexecuta só este painel."""
+    # Seleciona o mínimo de coocorrências exigido por aresta (filtra ruído)
+    min_edge_weight = st.slider(
+        "Mín. coocorrências (aresta)", 1, 5, 1, help="Filtra arestas fracas"
+    )
+    # Define a profundidade máxima para caminhos até o alvo (limita subgrafo)
+    max_path_depth = st.slider(
+        "Profundidade máx. caminho", 1, 8, 4, help="Caminhos até a palavra alvo"
+    )
+    # Alterna entre ver o grafo completo ou apenas caminhos que chegam ao alvo
+    show_paths_only = st.toggle(
+        "Mostrar apenas caminhos até a palavra alvo", value=True
+    )
+    # Como reduzir grafos grandes antes de desenhar (mantém o navegador leve)
+    _rotulos_poda = {
+        "frequencia": "Mais frequentes",
+        "grau": "Mais conectadas",
+        "kcore": "Núcleo denso (k-core)",
+        "arvore": "Árvore geradora + arestas fortes",
+    }
+    estrategia_poda = st.selectbox(
+        "Poda do grafo",
+        options=list(_rotulos_poda),
+        format_func=_rotulos_poda.get,
+        help="Critério para escolher quais nós/arestas exibir quando o grafo é grande",
     )
+    # Modo escuro apenas para o grafo (melhor contraste)
+    graph_dark_mode = st.toggle(
+        "Modo escuro (grafo)", value=True, help="Apenas afeta o grafo interativo."
+    )
+    # Layout calculado no servidor: sem física no navegador, posições estáveis entre turnos
+    graph_layout_servidor = st.toggle(
+        "Layout fixo (calculado no servidor)",
+        value=bool(config.get("grafo_layout_servidor", True)),
+        help="Desliga a simulação física do navegador; o grafo aparece pronto e estável.",
+    )
+
+    # Grafo derivado das contagens incrementais da sessão (aplica filtro de aresta)
+    G_full = obter_grafo_sessao(min_edge_weight=min_edge_weight) if _GRAPH_AVAILABLE else None
 
     if not _GRAPH_AVAILABLE:
         st.info("Para ver o grafo, instale: pip install networkx pyvis")
@@ -1173,33 +1586,62 @@ with graph_container:
         )
 
         # Se mostrar apenas caminhos até o alvo, extrai subgrafo limitado por profundidade
-        G_view = G_full
-        if show_paths_only and target:
-            G_tmp = subgraph_paths_to_target(G_full, target, max_depth=max_path_depth)
-            if G_tmp is not None and len(G_tmp) > 0:
-                G_view = G_tmp
-            else:
-                st.info("Não há caminhos dentro da profundidade escolhida.")
-                G_view = None
+        # (reaproveitado entre reruns enquanto nada muda)
+        nivel = 1 + st.session_state.get("grafo_nivel_detalhe", 0)
+        G_view, impressao, total_nos = obter_grafo_visao(
+            G_full,
+            target,
+            max_path_depth,
+            show_paths_only,
+            max_nos=config.get("grafo_max_nos", 80) * nivel,
+            max_arestas=config.get("grafo_max_arestas", 200) * nivel,
+            estrategia_poda=estrategia_poda,
+        )
+        if G_view is None:
+            st.info("Não há caminhos dentro da profundidade escolhida.")
+        elif len(G_view) < total_nos or nivel > 1:
+            st.caption(f"Exibindo {len(G_view)} de {total_nos} palavras")
+            col_lod1, col_lod2 = st.columns(2)
+            with col_lod1:
+                if len(G_view) < total_nos:
+                    st.button("➕ Mostrar mais", key="grafo_mais", on_click=_grafo_mostrar_mais)
+            with col_lod2:
+                if nivel > 1:
+                    st.button("➖ Resumir", key="grafo_menos", on_click=_grafo_mostrar_menos)
 
         if G_view is not None and len(G_view) > 0:
-            html, gerr = render_graph_pyvis(
+            # HTML em cache: reruns sem mudança no grafo não regeram o PyVis
+            html, gerr, posicoes = render_graph_pyvis_cached(
+                impressao,
                 G_view,
                 highlight_target=target,
                 height_px=520,
                 dark_mode=graph_dark_mode,
+                layout_servidor=graph_layout_servidor,
+                _pos_anterior=st.session_state.get("grafo_posicoes"),
             )
+            if posicoes:
+                # base do warm start do próximo layout (poucos nós novos por turno)
+                st.session_state["grafo_posicoes"] = posicoes
             st.session_state["grafo_html"] = html
             if gerr:
                 st.info(gerr)
             else:
-                # Exibe grafo interativo (PyVis) na sidebar
-                # Exibe grafo na sidebar (preview)
                 # preview do grafo na sidebar
                 st.components.v1.html(html, height=540, scrolling=True)
 
                 # botões na sidebar
-                col_sb1, col_sb2 = st.sidebar.columns(2)
+                col_sb1, col_sb2 = st.columns(2)
                 with col_sb1:
                     if st.button("🔎 Tela cheia (modal)", key="grafo_open_modal"):
                         show_grafo_modal()  # <-- abre o modal sem usar a área de diálogo
+
+
+with sent_container:
+    painel_sentimento(sentimento_habilitado)
+
+with wc_container:
+    painel_wordcloud()
+
+with graph_container:
+    painel_grafo()
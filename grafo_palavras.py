@@ -0,0 +1,271 @@
+"""
+Motor do grafo de palavras (coocorrências) com matrizes esparsas
+
+Os tokens são mapeados para IDs inteiros e as coocorrências são contadas
+com operações vetorizadas (NumPy / scipy.sparse) em vez de laços Python
+sobre pares. O networkx só é usado para materializar o grafo final, já
+filtrado.
+
+Convenções (iguais ao build_cooc_graph original do app):
+  - window_k = -1  => todos os pares de posições dentro da mesma mensagem
+  - window_k = k   => pares de posições (i, j) com 0 < j - i < k
+  - pares de uma palavra com ela mesma são ignorados
+  - nó: atributo 'count' (ocorrências); aresta: atributo 'weight'
+"""
+
+import weakref
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+
+def indexar_tokens(token_sequences: Iterable[Sequence[str]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Converte as mensagens em arrays planos:
+    - vocab: lista de palavras (ID = posição);
+    - ids: ID de cada token, na ordem;
+    - docs: índice da mensagem de cada token.
+    """
+    vocab_idx = {}
+    ids: List[int] = []
+    docs: List[int] = []
+    for d, tokens in enumerate(token_sequences):
+        for t in tokens:
+            ids.append(vocab_idx.setdefault(t, len(vocab_idx)))
+            docs.append(d)
+    return list(vocab_idx), np.asarray(ids, dtype=np.int64), np.asarray(docs, dtype=np.int64)
+
+
+def matriz_documento_termo(ids: np.ndarray, docs: np.ndarray, n_docs: int, n_vocab: int) -> sparse.csr_matrix:
+    """Matriz esparsa [mensagens x palavras] com a contagem de cada palavra por mensagem."""
+    dados = np.ones(len(ids), dtype=np.int64)
+    return sparse.csr_matrix((dados, (docs, ids)), shape=(n_docs, n_vocab))
+
+
+def matriz_coocorrencia(
+    token_sequences: Iterable[Sequence[str]], window_k: int = -1
+) -> Tuple[List[str], np.ndarray, sparse.csr_matrix]:
+    """
+    Retorna (vocab, contagem por palavra, C) onde C é triangular superior
+    (i < j) com o número de coocorrências entre as palavras i e j.
+    """
+    vocab, ids, docs = indexar_tokens(token_sequences)
+    n = len(vocab)
+    if n == 0:
+        return vocab, np.zeros(0, dtype=np.int64), sparse.csr_matrix((0, 0), dtype=np.int64)
+
+    contagens = np.bincount(ids, minlength=n)
+
+    if window_k == -1:
+        # Pares de posições com uma palavra a e outra b na mesma mensagem: c_a * c_b
+        X = matriz_documento_termo(ids, docs, int(docs[-1]) + 1, n)
+        C = (X.T @ X).tocsr()
+    else:
+        # Janela deslizante: para cada distância d, pares (token[i], token[i+d])
+        # da mesma mensagem
+        linhas, colunas = [], []
+        for d in range(1, max(1, int(window_k))):
+            if d >= len(ids):
+                break
+            mesma_msg = docs[:-d] == docs[d:]
+            linhas.append(ids[:-d][mesma_msg])
+            colunas.append(ids[d:][mesma_msg])
+        if linhas:
+            r = np.concatenate(linhas)
+            c = np.concatenate(colunas)
+        else:
+            r = c = np.zeros(0, dtype=np.int64)
+        C = sparse.coo_matrix((np.ones(len(r), dtype=np.int64), (r, c)), shape=(n, n)).tocsr()
+        C = C + C.T  # pares não-direcionados
+
+    # Remove a diagonal (palavra com ela mesma) e mantém só i < j
+    C = sparse.triu(C, k=1).tocsr()
+    C.eliminate_zeros()
+    return vocab, contagens, C
+
+
+def grafo_coocorrencia(
+    token_sequences: Iterable[Sequence[str]], *, window_k: int = -1, min_edge_weight: int = 1
+) -> nx.Graph:
+    """Grafo de coocorrência filtrado (arestas com peso >= min_edge_weight)."""
+    vocab, contagens, C = matriz_coocorrencia(token_sequences, window_k=window_k)
+
+    G = nx.Graph()
+    G.add_nodes_from((w, {"count": int(c)}) for w, c in zip(vocab, contagens))
+
+    coo = C.tocoo()
+    manter = coo.data >= int(min_edge_weight)
+    G.add_edges_from(
+        (vocab[i], vocab[j], {"weight": int(w)})
+        for i, j, w in zip(coo.row[manter], coo.col[manter], coo.data[manter])
+    )
+    return G
+
+
+# ═══════════════════════════════════════════════════════
+# Adjacência CSR e alcance (BFS) vetorizado
+# ═══════════════════════════════════════════════════════
+
+# Adjacência por grafo (chave: o próprio objeto; some junto com ele)
+_ADJACENCIAS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def adjacencia_csr(G: nx.Graph) -> Tuple[List, Dict, sparse.csr_matrix]:
+    """
+    (nós, índice nó -> ID, matriz de adjacência CSR) do grafo. Calculada uma
+    vez por objeto de grafo; o grafo não deve ser alterado depois disso.
+    """
+    adj = _ADJACENCIAS.get(G)
+    if adj is None:
+        nos = list(G.nodes)
+        indice = {n: i for i, n in enumerate(nos)}
+        n = len(nos)
+        if G.number_of_edges():
+            u, v = zip(*((indice[a], indice[b]) for a, b in G.edges))
+            r = np.asarray(u + v, dtype=np.int64)
+            c = np.asarray(v + u, dtype=np.int64)
+        else:
+            r = c = np.zeros(0, dtype=np.int64)
+        A = sparse.csr_matrix((np.ones(len(r), dtype=np.int8), (r, c)), shape=(n, n))
+        adj = (nos, indice, A)
+        _ADJACENCIAS[G] = adj
+    return adj
+
+
+def nos_alcancaveis(G: nx.Graph, alvo, max_depth: int = 4) -> Set:
+    """
+    Nós a no máximo `max_depth` arestas do alvo (incluindo ele). BFS por
+    camadas sobre a CSR: os vizinhos de toda a fronteira saem de uma vez
+    de A[fronteira].indices, sem laço Python por nó.
+    """
+    if alvo not in G:
+        return set()
+    nos, indice, A = adjacencia_csr(G)
+    visitado = np.zeros(len(nos), dtype=bool)
+    fronteira = np.array([indice[alvo]], dtype=np.int64)
+    visitado[fronteira] = True
+    for _ in range(max(0, int(max_depth))):
+        vizinhos = A[fronteira].indices
+        fronteira = np.unique(vizinhos[~visitado[vizinhos]])
+        if fronteira.size == 0:
+            break
+        visitado[fronteira] = True
+    return {nos[i] for i in np.flatnonzero(visitado)}
+
+
+# ═══════════════════════════════════════════════════════
+# Poda (nível de detalhe) antes de renderizar
+# ═══════════════════════════════════════════════════════
+
+ESTRATEGIAS_PODA = ("frequencia", "grau", "kcore", "arvore")
+
+
+def _ranking_nos(G: nx.Graph, estrategia: str) -> List:
+    """Nós ordenados do mais ao menos importante segundo a estratégia."""
+    count = dict(G.nodes(data="count", default=1))
+    grau = dict(G.degree(weight="weight"))
+    if estrategia == "grau":
+        chave = lambda n: (-grau[n], -count[n], str(n))  # noqa: E731
+    elif estrategia == "kcore":
+        core = nx.core_number(G)
+        chave = lambda n: (-core[n], -count[n], str(n))  # noqa: E731
+    else:  # "frequencia" e "arvore"
+        chave = lambda n: (-count[n], -grau[n], str(n))  # noqa: E731
+    return sorted(G.nodes, key=chave)
+
+
+def podar_grafo(
+    G: nx.Graph,
+    max_nos: int = 100,
+    max_arestas: int = 300,
+    estrategia: str = "frequencia",
+    manter: Sequence = (),
+) -> nx.Graph:
+    """
+    Mantém o custo de renderização limitado:
+    - nós: os `max_nos` mais importantes (frequência, grau ponderado ou k-core),
+      sempre incluindo os nós em `manter` (ex.: palavra alvo);
+    - arestas: as `max_arestas` de maior peso entre os nós mantidos; na
+      estratégia "arvore", primeiro a árvore geradora máxima (preserva a
+      conectividade) e depois as arestas mais fortes restantes.
+    Retorna um novo grafo (o original não é alterado).
+    """
+    if estrategia not in ESTRATEGIAS_PODA:
+        estrategia = "frequencia"
+    max_nos = max(1, int(max_nos))
+    max_arestas = max(0, int(max_arestas))
+
+    if len(G) <= max_nos and G.number_of_edges() <= max_arestas:
+        return G.copy()
+
+    fixos = [n for n in manter if n in G]
+    escolhidos = list(dict.fromkeys(fixos))
+    if len(G) > max_nos:
+        for n in _ranking_nos(G, estrategia):
+            if len(escolhidos) >= max_nos:
+                break
+            if n not in fixos:
+                escolhidos.append(n)
+    else:
+        escolhidos = list(G.nodes)
+
+    H = G.subgraph(escolhidos)
+    arestas = sorted(
+        H.edges(data="weight", default=1),
+        key=lambda e: (-e[2], *sorted((str(e[0]), str(e[1])))),
+    )
+
+    if estrategia == "arvore":
+        # Arestas da árvore geradora máxima primeiro, depois as mais fortes
+        arvore = nx.maximum_spanning_tree(H, weight="weight")
+        na_arvore = {frozenset(e) for e in arvore.edges}
+        arestas = [e for e in arestas if frozenset(e[:2]) in na_arvore] + [
+            e for e in arestas if frozenset(e[:2]) not in na_arvore
+        ]
+    selecionadas = arestas[:max_arestas]
+
+    P = nx.Graph()
+    P.add_nodes_from((n, G.nodes[n]) for n in escolhidos)
+    P.add_edges_from((u, v, {**G.edges[u, v]}) for u, v, _ in selecionadas)
+    return P
+
+
+# ═══════════════════════════════════════════════════════
+# Layout calculado no servidor
+# ═══════════════════════════════════════════════════════
+
+def layout_grafo(
+    G: nx.Graph,
+    pos_anterior: Optional[Dict] = None,
+    iteracoes: int = 50,
+    seed: int = 42,
+) -> Dict:
+    """
+    Posições (x, y) em [-1, 1] por força (Fruchterman-Reingold do networkx,
+    vetorizado em NumPy). Com `pos_anterior`, faz warm start: nós já
+    posicionados partem de onde estavam e nós novos nascem perto dos
+    vizinhos, então poucas iterações bastam e o desenho fica estável
+    entre os turnos.
+    """
+    if len(G) == 0:
+        return {}
+
+    pos_inicial = None
+    if pos_anterior:
+        conhecidos = {n: np.asarray(pos_anterior[n], dtype=float) for n in G if n in pos_anterior}
+        if conhecidos:
+            rng = np.random.default_rng(seed)
+            pos_inicial = dict(conhecidos)
+            for n in G:
+                if n in pos_inicial:
+                    continue
+                vizinhos = [conhecidos[v] for v in G.neighbors(n) if v in conhecidos]
+                centro = np.mean(vizinhos, axis=0) if vizinhos else np.zeros(2)
+                pos_inicial[n] = centro + rng.normal(scale=0.05, size=2)
+            novos = len(G) - len(conhecidos)
+            iteracoes = min(iteracoes, max(10, 5 * novos))
+
+    pos = nx.spring_layout(G, pos=pos_inicial, iterations=iteracoes, weight="weight", seed=seed)
+    return {n: (float(x), float(y)) for n, (x, y) in pos.items()}
@@ -0,0 +1,336 @@
+"""
+Caches do sistema RAG
+
+LRUCache: cache em memória, limitado, com TTL opcional e thread-safe
+(ex.: embeddings de consultas repetidas e resultados de busca).
+
+EmbeddingCache: cache persistente em disco de embeddings, chaveado por
+(modelo de embeddings, sha256 do texto). Evita recalcular embeddings ao
+recarregar a base ou recriar a coleção no Qdrant.
+
+Layout em disco (uma pasta por modelo):
+    <cache_dir>/<modelo>/shard_000001.npy   # matriz float32 [shard_rows, dim] pré-alocada
+    <cache_dir>/<modelo>/shard_000001.keys  # hashes das linhas ocupadas, um por linha
+
+Lotes pequenos são acrescentados no lugar ao último shard (escrita só das
+linhas novas no memmap e append no .keys) até shard_rows linhas, então o
+número de shards fica limitado (~max_entries / shard_rows) sem regravar o
+que já está em disco. O .keys é gravado depois dos vetores: o número de
+linhas completas nele é o número de linhas válidas do shard. Os shards são
+lidos via memory-map, com no máximo max_open_shards abertos ao mesmo tempo.
+O mtime do arquivo .keys marca o último uso do shard; ao exceder
+max_entries, os shards menos usados recentemente são removidos.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+def text_key(text: str) -> str:
+    """Chave de cache de um texto (sha256)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Cache LRU limitado a `maxsize` itens, seguro para uso entre threads.
+    Com `ttl` (segundos), itens expiram após esse tempo.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def get_stats(self) -> Dict:
+        # Snapshot consistente: size, hits e misses lidos sob o mesmo lock
+        with self._lock:
+            size, hits, misses = len(self._data), self.hits, self.misses
+        total = hits + misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+        }
+
+
+class EmbeddingCache:
+    """Cache de embeddings em shards .npy memory-mapped com despejo por LRU de shard."""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        model_name: str,
+        max_entries: int = 200_000,
+        shard_rows: int = 8192,
+        max_open_shards: int = 16,
+    ):
+        safe_model = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = Path(cache_dir) / safe_model
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.max_entries = int(max_entries)
+        self.shard_rows = max(1, int(shard_rows))
+        self.max_open_shards = max(1, int(max_open_shards))
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, int]] = {}  # hash -> (shard, linha)
+        self._shard_sizes: Dict[int, int] = {}
+        self._mmaps: "OrderedDict[int, np.ndarray]" = OrderedDict()  # LRU de memmaps abertos
+        self._next_shard = 1
+        self.hits = 0
+        self.misses = 0
+
+        self._load_index()
+
+    # ----------------------------------------------------
+    # Arquivos
+    # ----------------------------------------------------
+    def _shard_files(self, shard: int) -> Tuple[Path, Path]:
+        base = self.path / f"shard_{shard:06d}"
+        return base.with_suffix(".npy"), base.with_suffix(".keys")
+
+    @staticmethod
+    def _read_keys(keys_file: Path) -> List[str]:
+        """Hashes das linhas completas; uma linha parcial (append interrompido) é descartada."""
+        data = keys_file.read_bytes()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            with open(keys_file, "r+b") as f:
+                f.truncate(end)
+        return data[:end].decode("utf-8").splitlines()
+
+    def _load_index(self):
+        for keys_file in sorted(self.path.glob("shard_*.keys")):
+            shard = int(keys_file.name.split("_")[1].split(".")[0])
+            npy_file, _ = self._shard_files(shard)
+            try:
+                if not npy_file.exists():
+                    raise FileNotFoundError(npy_file)
+                keys = self._read_keys(keys_file)
+            except Exception:
+                # Shard incompleto (ex.: processo interrompido na criação)
+                self._remove_shard_files(shard)
+                continue
+            for row, key in enumerate(keys):
+                self._index[key] = (shard, row)
+            self._shard_sizes[shard] = len(keys)
+            self._next_shard = max(self._next_shard, shard + 1)
+
+        # Temporários de uma escrita interrompida e .keys.json do formato antigo
+        for stale in [*self.path.glob("shard_*.tmp"), *self.path.glob("shard_*.keys.json")]:
+            stale.unlink(missing_ok=True)
+
+        # .npy órfãos (sem .keys)
+        for npy_file in self.path.glob("shard_*.npy"):
+            if not npy_file.with_suffix(".keys").exists():
+                npy_file.unlink(missing_ok=True)
+
+    def _remove_shard_files(self, shard: int):
+        self._mmaps.pop(shard, None)
+        for f in self._shard_files(shard):
+            try:
+                f.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def _shard_array(self, shard: int) -> np.ndarray:
+        arr = self._mmaps.get(shard)
+        if arr is None:
+            arr = np.load(self._shard_files(shard)[0], mmap_mode="r+")
+            self._mmaps[shard] = arr
+            # Fecha os memmaps mais antigos (limita descritores de arquivo)
+            while len(self._mmaps) > self.max_open_shards:
+                self._mmaps.popitem(last=False)
+        else:
+            self._mmaps.move_to_end(shard)
+        return arr
+
+    def _create_shard(self, shard: int, capacity: int, vectors: np.ndarray, keys: List[str]):
+        """Cria o shard pré-alocado com `capacity` linhas: .npy primeiro, .keys por último."""
+        npy_file, keys_file = self._shard_files(shard)
+        tmp = npy_file.with_name(npy_file.name + ".tmp")
+        arr = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=np.float32, shape=(capacity, vectors.shape[1])
+        )
+        arr[: len(keys)] = vectors
+        arr.flush()
+        del arr
+        os.replace(tmp, npy_file)
+        self._append_keys(keys_file, keys)
+
+    @staticmethod
+    def _append_keys(keys_file: Path, keys: List[str]):
+        with open(keys_file, "ab") as f:
+            f.write("".join(f"{k}\n" for k in keys).encode("utf-8"))
+            f.flush()
+
+    # ----------------------------------------------------
+    # API
+    # ----------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_many(self, keys: List[str]) -> Dict[int, np.ndarray]:
+        """Retorna {posição em keys: vetor} para as chaves presentes no cache."""
+        found: Dict[int, np.ndarray] = {}
+        used_shards = set()
+        with self._lock:
+            for i, key in enumerate(keys):
+                loc = self._index.get(key)
+                if loc is None:
+                    continue
+                shard, row = loc
+                try:
+                    found[i] = np.array(self._shard_array(shard)[row], dtype=np.float32)
+                except Exception:
+                    continue
+                used_shards.add(shard)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        # Marca uso dos shards (LRU)
+        for shard in used_shards:
+            try:
+                os.utime(self._shard_files(shard)[1])
+            except OSError:
+                pass
+        return found
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        """Grava os vetores no último shard ou num novo (chaves já presentes são ignoradas)."""
+        with self._lock:
+            new_rows = [i for i, k in enumerate(keys) if k not in self._index]
+            # Remove duplicatas dentro do próprio lote
+            seen = set()
+            rows = []
+            for i in new_rows:
+                if keys[i] not in seen:
+                    seen.add(keys[i])
+                    rows.append(i)
+            if not rows:
+                return
+
+            new_vectors = np.asarray(vectors, dtype=np.float32)[rows]
+            new_keys = [keys[i] for i in rows]
+
+            # Acrescenta no lugar ao último shard enquanto couber; senão abre um novo
+            shard = max(self._shard_sizes) if self._shard_sizes else None
+            start = 0
+            if shard is not None:
+                start = self._shard_sizes[shard]
+                try:
+                    arr = self._shard_array(shard)
+                    if start + len(rows) > arr.shape[0] or arr.shape[1] != new_vectors.shape[1]:
+                        shard = None
+                    else:
+                        # Vetores antes das chaves: linhas sem chave são só sobrescritas depois
+                        arr[start : start + len(rows)] = new_vectors
+                        arr.flush()
+                        self._append_keys(self._shard_files(shard)[1], new_keys)
+                except Exception:
+                    shard = None
+
+            if shard is None:
+                shard = self._next_shard
+                self._next_shard += 1
+                start = 0
+                try:
+                    self._create_shard(
+                        shard, max(self.shard_rows, len(rows)), new_vectors, new_keys
+                    )
+                except OSError:
+                    self._remove_shard_files(shard)
+                    return
+
+            for row, key in enumerate(new_keys, start=start):
+                self._index[key] = (shard, row)
+            self._shard_sizes[shard] = start + len(new_keys)
+
+            self._evict()
+
+    def _evict(self):
+        """Remove os shards usados há mais tempo até caber em max_entries."""
+        total = sum(self._shard_sizes.values())
+        if total <= self.max_entries:
+            return
+
+        def last_used(shard: int) -> float:
+            try:
+                return self._shard_files(shard)[1].stat().st_mtime
+            except OSError:
+                return 0.0
+
+        for shard in sorted(self._shard_sizes, key=lambda s: (last_used(s), s)):
+            if total <= self.max_entries:
+                break
+            for key in [k for k, (s, _) in self._index.items() if s == shard]:
+                del self._index[key]
+            total -= self._shard_sizes.pop(shard)
+            self._remove_shard_files(shard)
+
+    def clear(self):
+        """Apaga todo o cache deste modelo."""
+        with self._lock:
+            for shard in list(self._shard_sizes):
+                self._remove_shard_files(shard)
+            self._index.clear()
+            self._shard_sizes.clear()
+
+    def get_stats(self) -> Dict:
+        return {
+            "entries": len(self._index),
+            "shards": len(self._shard_sizes),
+            "open_shards": len(self._mmaps),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "path": str(self.path),
+        }
@@ -0,0 +1,137 @@
+"""
+Chunking de documentos para o sistema RAG
+
+Quebra o texto em pedaços (chunks) por palavras, respeitando fronteiras de
+frase/linha, com overlap entre chunks consecutivos. Os chunks são gerados
+de forma preguiçosa (streaming), lendo o arquivo linha a linha.
+
+O tamanho efetivo do chunk respeita o limite de tokens do modelo de
+embeddings (max_seq_length): texto além desse limite seria truncado
+silenciosamente pelo SentenceTransformer.
+"""
+
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Estimativa conservadora de palavras por token. 0.75 vale para inglês; em
+# PT-BR (acentos, flexões) os tokenizers subword quebram cada palavra em mais
+# pedaços, ~1.6-1.9 tokens por palavra
+WORDS_PER_TOKEN = 0.55
+
+# [CLS]/[SEP] (ou <s>/</s>) também contam no max_seq_length
+SPECIAL_TOKENS = 2
+
+# Fim de frase: pontuação seguida de espaço
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?;])\s+")
+
+
+def effective_chunk_size(chunk_size: int, max_seq_length: Optional[int] = None) -> int:
+    """
+    Tamanho máximo do chunk (em palavras), limitado pelo max_seq_length do modelo.
+    """
+    size = max(1, int(chunk_size))
+    if max_seq_length:
+        size = min(size, max(1, int((max_seq_length - SPECIAL_TOKENS) * WORDS_PER_TOKEN)))
+    return size
+
+
+def iter_sentences(lines: Iterable[str]) -> Iterator[Tuple[List[str], bool]]:
+    """
+    Gera as frases do texto como (palavras, nova_linha), onde nova_linha indica
+    que a frase começou em uma nova linha (para preservar a estrutura no chunk).
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        first = True
+        for sentence in _SENTENCE_SPLIT.split(line):
+            words = sentence.split()
+            if words:
+                yield words, first
+                first = False
+
+
+def _join(units: List[Tuple[List[str], bool]]) -> str:
+    parts: List[str] = []
+    for i, (words, newline) in enumerate(units):
+        if i > 0:
+            parts.append("\n" if newline else " ")
+        parts.append(" ".join(words))
+    return "".join(parts)
+
+
+def _tail(units: List[Tuple[List[str], bool]], overlap: int) -> List[Tuple[List[str], bool]]:
+    """Últimas frases do chunk que cabem no overlap (corta a última se preciso)."""
+    if overlap <= 0:
+        return []
+    tail: List[Tuple[List[str], bool]] = []
+    total = 0
+    for words, newline in reversed(units):
+        if total + len(words) > overlap:
+            if not tail:
+                tail.append((words[-overlap:], newline))
+            break
+        tail.insert(0, (words, newline))
+        total += len(words)
+    return tail
+
+
+def iter_chunks(
+    lines: Iterable[str],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    max_seq_length: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Gera chunks de até `chunk_size` palavras (limitado pelo modelo), com até
+    `chunk_overlap` palavras repetidas do chunk anterior.
+
+    Frases nunca são quebradas, exceto quando sozinhas excedem o tamanho do chunk.
+    """
+    size = effective_chunk_size(chunk_size, max_seq_length)
+    overlap = max(0, min(int(chunk_overlap), size // 2))
+
+    units: List[Tuple[List[str], bool]] = []
+    count = 0
+    fresh = False  # há conteúdo novo (além do overlap) no chunk atual?
+
+    for words, newline in iter_sentences(lines):
+        # Frase maior que o chunk: quebra em janelas de palavras
+        while len(words) > size:
+            if fresh:
+                yield _join(units)
+            yield " ".join(words[:size])
+            # O overlap vem da própria frase
+            words = words[size - overlap:]
+            newline = False
+            units, count, fresh = [], 0, False
+
+        if count + len(words) > size and fresh:
+            yield _join(units)
+            units = _tail(units, overlap)
+            count = sum(len(w) for w, _ in units)
+            # Garante espaço para a frase nova
+            while units and count + len(words) > size:
+                count -= len(units[0][0])
+                units.pop(0)
+
+        units.append((words, newline))
+        count += len(words)
+        fresh = True
+
+    if fresh:
+        yield _join(units)
+
+
+def iter_file_chunks(
+    path,
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    max_seq_length: Optional[int] = None,
+    encoding: str = "utf-8",
+) -> Iterator[str]:
+    """Gera os chunks de um arquivo de texto sem carregá-lo inteiro na memória."""
+    with Path(path).open("r", encoding=encoding) as f:
+        yield from iter_chunks(f, chunk_size, chunk_overlap, max_seq_length)
@@ -14,11 +14,46 @@ RAG_CONFIG = {
 
     # Pastas
     "knowledge_base_dir": "./rag/base_conhecimento",
-    "persist_path": "./rag/qdrant_storage",
+    "persist_path": os.getenv("QDRANT_PATH", "./rag/qdrant_storage"),
+
+    # Modo do Qdrant (env QDRANT_MODE):
+    # "server" = serviço HTTP em QDRANT_HOST:QDRANT_PORT (padrão)
+    # "local"  = embutido no processo, gravando em persist_path (sem container)
+    # "memory" = embutido, só em memória (testes/benchmarks)
+    "qdrant_mode": os.getenv("QDRANT_MODE", "server").lower(),
 
     # Coleção Qdrant
     "collection_name": "voxmap_kb",
 
+    # Armazenamento de vetores (env RAG_VECTOR_STORE):
+    # "qdrant" = coleção no Qdrant (padrão)
+    # "numpy"  = busca exata em processo (matriz memory-mapped), ideal p/ bases pequenas
+    "vector_store": os.getenv("RAG_VECTOR_STORE", "qdrant").lower(),
+    "vector_store_fallback": True,  # Qdrant fora do ar => usa o NumPy em vez de falhar
+    "vector_store_retry_seconds": 60,  # Em modo degradado, intervalo entre tentativas de voltar ao Qdrant
+    "numpy_store_dir": "./rag/numpy_store",
+    "numpy_store_dtype": "float32",  # "float16" reduz memória/disco pela metade
+
+    # Índices de payload (keyword) no Qdrant: filtros por categoria/arquivo sem varrer payloads
+    "payload_indexes": ["category", "source", "file_type"],
+
+    # Quantização no Qdrant (env RAG_QUANTIZATION): "none" | "scalar" (int8, ~4x menos RAM)
+    # | "binary" (1 bit/dim, ~32x menos RAM; indicado p/ embeddings com >= 768 dims).
+    # Mudar numa coleção existente requantiza os vetores já gravados (sem re-embedar).
+    "quantization": os.getenv("RAG_QUANTIZATION", "none").lower(),
+    "quantization_always_ram": True,  # vetores quantizados sempre em RAM
+    "quantization_oversampling": 2.0,  # busca top_k * oversampling nos quantizados...
+    "quantization_rescore": True,  # ...e reordena pelos vetores originais
+
+    # Armazenamento no Qdrant (None = padrão do servidor). Para bases grandes:
+    # vetores e payload (texto dos chunks) em disco via mmap, com quantization
+    # "scalar" + always_ram mantendo só a cópia int8 em RAM para a busca.
+    # Coleções existentes são ajustadas na inicialização, sem re-embedar
+    # (conversão completa: python rag/utils/migrar_colecao.py).
+    "vectors_on_disk": None,
+    "payload_on_disk": None,
+    "hnsw_on_disk": None,
+
     # Modelo de embeddings (multilíngue PT-BR)
     # Opções:
     # - "paraphrase-multilingual-MiniLM-L12-v2" (recomendado, rápido)
@@ -26,12 +61,30 @@ RAG_CONFIG = {
     "embedding_model": "paraphrase-multilingual-MiniLM-L12-v2",
 
     # Processamento de texto
+    # chunk_size é limitado ao max_seq_length do modelo de embeddings
+    # (~0.55 palavra por token em PT-BR), para não haver truncamento. Ex.:
+    # paraphrase-multilingual-MiniLM-L12-v2 = 128 tokens ≈ 69 palavras;
+    # all-MiniLM-L6-v2 = 256 tokens ≈ 139 palavras.
     "chunk_size": 500,  # Tamanho dos chunks em palavras
     "chunk_overlap": 50,  # Overlap entre chunks
 
+    # Indexação em lotes
+    "embedding_batch_size": 32,  # Textos por forward pass do modelo
+    "upsert_batch_size": 256,  # Chunks embedados/gravados por lote (memória constante)
+
+    # Cache de embeddings em disco (chave: modelo + sha256 do chunk)
+    "embedding_cache_enabled": True,
+    "embedding_cache_dir": "./rag/embedding_cache",
+    "embedding_cache_max_entries": 200_000,  # ~300 MB com vetores de 384 dims
+    "embedding_cache_shard_rows": 8192,  # Lotes pequenos são acrescentados ao último shard
+    "embedding_cache_max_open_shards": 16,  # Memmaps abertos ao mesmo tempo (descritores)
+
     # Busca
     "default_top_k": 3,  # Número de documentos retornados
     "score_threshold": 0.5,  # Score mínimo (0-1)
+    "query_cache_size": 1024,  # Embeddings de consultas mantidos em memória (LRU)
+    "result_cache_size": 256,  # Resultados de retrieve() em cache (LRU)
+    "result_cache_ttl": 300,  # Validade (segundos) de um resultado em cache
 
     # UI
     "show_sources": True,  # Mostrar fontes na UI
@@ -133,13 +186,14 @@ def format_rag_context(documents: list) -> str:
     if not documents:
         return ""
 
+    # Chunk inteiro: o chunker já limita o tamanho ao max_seq_length do modelo
     context_parts = []
     for doc in documents:
         formatted_doc = INTEGRATION_CONFIG["document_template"].format(
             source=doc.get("source", "Desconhecido"),
             category=doc.get("category", "geral"),
             score=doc.get("score", 0.0),
-            text=doc.get("text", "")[:500] + ("..." if len(doc.get("text", "")) > 500 else "")
+            text=doc.get("text", ""),
         )
         context_parts.append(formatted_doc)
 
@@ -1,20 +1,151 @@
 import os
 import glob
+import hashlib
+import threading
+import time
+import uuid
 from pathlib import Path
 from typing import List, Dict, Optional
 
+import numpy as np
 from qdrant_client import QdrantClient
-from qdrant_client.http import models
 from sentence_transformers import SentenceTransformer
 
+from .rag_config import RAG_CONFIG
+from .rag_chunker import effective_chunk_size, iter_file_chunks
+from .rag_cache import EmbeddingCache, LRUCache, text_key
+from .rag_store import NumpyStore, QdrantStore, VectorStore
+
+
+# Namespace fixo para gerar IDs determinísticos (uuid5) dos pontos no Qdrant
+_POINT_ID_NAMESPACE = uuid.UUID("6f1c2b8e-3d4a-5e6f-8a9b-0c1d2e3f4a5b")
+
+
+def content_hash(path, salt: str = "") -> str:
+    """
+    SHA-256 do conteúdo de um arquivo (usado para detectar alterações).
+    `salt` entra no hash para que mudanças no modelo de embeddings ou na
+    configuração de chunking também forcem a reindexação do arquivo.
+    """
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    h.update(salt.encode("utf-8"))
+    return h.hexdigest()
+
+
+QDRANT_MODES = ("server", "local", "memory")
+
+
+def qdrant_mode(mode: Optional[str] = None) -> str:
+    """Modo do Qdrant validado (padrão: RAG_CONFIG["qdrant_mode"])."""
+    mode = (mode or RAG_CONFIG.get("qdrant_mode", "server")).lower()
+    if mode not in QDRANT_MODES:
+        raise ValueError(f"QDRANT_MODE inválido: {mode!r} (use {', '.join(QDRANT_MODES)})")
+    return mode
+
+
+def create_qdrant_client(mode: Optional[str] = None, verbose: bool = True) -> QdrantClient:
+    """
+    Cria o cliente Qdrant conforme o modo (padrão: RAG_CONFIG["qdrant_mode"]):
+    - "server": HTTP em QDRANT_HOST:QDRANT_PORT;
+    - "local": Qdrant embutido no processo, persistido em RAG_CONFIG["persist_path"];
+    - "memory": Qdrant embutido apenas em memória.
+    No modo "local" a pasta fica travada pelo processo: compartilhe o cliente.
+    """
+    mode = qdrant_mode(mode)
+    if mode == "memory":
+        if verbose:
+            print("📡 Qdrant embutido em memória (:memory:)")
+        return QdrantClient(location=":memory:")
+
+    if mode == "local":
+        path = RAG_CONFIG.get("persist_path", "./rag/qdrant_storage")
+        Path(path).mkdir(parents=True, exist_ok=True)
+        if verbose:
+            print(f"📡 Qdrant embutido em disco: {path}")
+        return QdrantClient(path=path)
+
+    host = os.getenv("QDRANT_HOST", "localhost")
+    port = int(os.getenv("QDRANT_PORT", 6333))
+    if verbose:
+        print(f"📡 Conectando ao Qdrant em {host}:{port} ...")
+    return QdrantClient(host=host, port=port)
+
+
+def create_qdrant_store(
+    client: QdrantClient,
+    collection_name: str,
+    verbose: bool = True,
+    mode: Optional[str] = None,
+) -> QdrantStore:
+    """
+    QdrantStore com índices, quantização e armazenamento definidos no RAG_CONFIG.
+    `mode` é o mesmo usado em create_qdrant_client (padrão: RAG_CONFIG).
+    """
+    return QdrantStore(
+        client,
+        collection_name,
+        verbose=verbose,
+        payload_indexes=RAG_CONFIG.get("payload_indexes", ("category", "source", "file_type")),
+        quantization=RAG_CONFIG.get("quantization", "none"),
+        quantization_always_ram=RAG_CONFIG.get("quantization_always_ram", True),
+        quantization_oversampling=RAG_CONFIG.get("quantization_oversampling", 2.0),
+        quantization_rescore=RAG_CONFIG.get("quantization_rescore", True),
+        vectors_on_disk=RAG_CONFIG.get("vectors_on_disk"),
+        payload_on_disk=RAG_CONFIG.get("payload_on_disk"),
+        hnsw_on_disk=RAG_CONFIG.get("hnsw_on_disk"),
+        embedded=qdrant_mode(mode) != "server",
+    )
+
+
+# Embeddings de consultas, compartilhados por todas as instâncias/sessões do processo
+# chave: (modelo, consulta normalizada)
+_QUERY_EMBEDDING_CACHE = LRUCache(maxsize=RAG_CONFIG.get("query_cache_size", 1024))
+
+
+# Modelos de embeddings carregados no processo (um por nome de modelo)
+_EMBEDDING_MODELS: Dict[str, SentenceTransformer] = {}
+_EMBEDDING_MODELS_LOCK = threading.Lock()
+
+
+def get_embedding_model(model_name: str) -> SentenceTransformer:
+    """
+    Carrega o SentenceTransformer uma única vez por processo; instâncias
+    seguintes do QdrantRAG (ex.: reruns do Streamlit) reutilizam o mesmo modelo.
+    """
+    with _EMBEDDING_MODELS_LOCK:
+        model = _EMBEDDING_MODELS.get(model_name)
+        if model is None:
+            model = SentenceTransformer(model_name, device="cpu")
+            _EMBEDDING_MODELS[model_name] = model
+        return model
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normaliza só os espaços da consulta. A caixa é mantida: modelos cased
+    geram embeddings diferentes para "Senha" e "senha".
+    """
+    return " ".join(query.split())
+
+
+def point_id(source: str, doc_hash: str, chunk_index: int = 0) -> str:
+    """
+    ID determinístico de um ponto: mesmo arquivo + mesmo conteúdo + mesmo chunk
+    geram sempre o mesmo ID, então reindexar não duplica pontos.
+    """
+    return str(uuid.uuid5(_POINT_ID_NAMESPACE, f"{source}|{doc_hash}|{chunk_index}"))
+
 
 class QdrantRAG:
     """
-    RAG integrado com Qdrant.
+    RAG integrado com Qdrant (ou busca exata NumPy, ver rag_store.py).
 
     Funcionalidades principais usadas pelo app_01.py:
     - carregar documentos da pasta ./rag/base_conhecimento
-    - indexar no Qdrant (coleção rag_collection)
+    - indexar no armazenamento de vetores (coleção rag_collection)
     - buscar documentos relevantes (retrieve)
     - limpar/recarregar base (clear + load_documents)
     - expor estatísticas (get_stats)
@@ -25,21 +156,31 @@ class QdrantRAG:
         knowledge_base_dir: str = "./rag/base_conhecimento",
         collection_name: str = "rag_collection",
         verbose: bool = True,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        embedding_batch_size: Optional[int] = None,
+        upsert_batch_size: Optional[int] = None,
+        client: Optional[QdrantClient] = None,
     ):
         self.knowledge_base_dir = knowledge_base_dir
         self.collection_name = collection_name
         self.verbose = verbose
+        self.chunk_size = int(chunk_size or RAG_CONFIG.get("chunk_size", 500))
+        self.chunk_overlap = int(
+            chunk_overlap if chunk_overlap is not None else RAG_CONFIG.get("chunk_overlap", 50)
+        )
+        self.embedding_batch_size = int(
+            embedding_batch_size or RAG_CONFIG.get("embedding_batch_size", 32)
+        )
+        self.upsert_batch_size = int(upsert_batch_size or RAG_CONFIG.get("upsert_batch_size", 256))
 
         # -------------------------------
         # 🔌 Conexão com Qdrant
         # -------------------------------
-        host = os.getenv("QDRANT_HOST", "localhost")
-        port = int(os.getenv("QDRANT_PORT", 6333))
-
-        if self.verbose:
-            print(f"📡 Conectando ao Qdrant em {host}:{port} ...")
-
-        self.client = QdrantClient(host=host, port=port)
+        # Um cliente já conectado pode ser compartilhado (ex.: recurso do Streamlit);
+        # sem cliente, ele é criado em _create_store() conforme QDRANT_MODE
+        self._owns_client = client is None
+        self.client = client
 
         # -------------------------------
         # 🧠 Modelo de embeddings
@@ -51,28 +192,69 @@ class QdrantRAG:
         if self.verbose:
             print(f"🧠 Carregando modelo de embeddings: {model_name}")
 
-        self.embedding_model = SentenceTransformer(model_name, device="cpu")
+        self.model_name = model_name
+        self.embedding_model = get_embedding_model(model_name)
         self.embedding_dim = self.embedding_model.get_sentence_embedding_dimension()
+        self.max_seq_length = getattr(self.embedding_model, "max_seq_length", None)
+
+        # Cache persistente de embeddings (evita re-embedar em reloads)
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if RAG_CONFIG.get("embedding_cache_enabled", True):
+            try:
+                self.embedding_cache = EmbeddingCache(
+                    RAG_CONFIG.get("embedding_cache_dir", "./rag/embedding_cache"),
+                    model_name,
+                    max_entries=RAG_CONFIG.get("embedding_cache_max_entries", 200_000),
+                    shard_rows=RAG_CONFIG.get("embedding_cache_shard_rows", 8192),
+                    max_open_shards=RAG_CONFIG.get("embedding_cache_max_open_shards", 16),
+                )
+                if self.verbose:
+                    print(f"💾 Cache de embeddings: {len(self.embedding_cache)} vetores em disco.")
+            except Exception as e:
+                print(f"⚠️ Cache de embeddings desativado: {e}")
+
+        # -------------------------------
+        # 🗂 Cache de resultados de busca
+        # -------------------------------
+        # A "geração" muda a cada alteração da coleção e faz parte da chave,
+        # então resultados anteriores a uma reindexação nunca são servidos.
+        self._generation = 0
+        self._result_cache = LRUCache(
+            maxsize=RAG_CONFIG.get("result_cache_size", 256),
+            ttl=RAG_CONFIG.get("result_cache_ttl", 300),
+        )
+
+        # -------------------------------
+        # 🗄 Armazenamento de vetores (Qdrant ou NumPy)
+        # -------------------------------
+        self.store: VectorStore = self._create_store()
+        # Modo degradado (NumPy no lugar do Qdrant): health_check agenda a volta
+        # numa thread em segundo plano, fora do script do usuário
+        self._reconnect_lock = threading.Lock()
+        self._reconnect_thread: Optional[threading.Thread] = None
+        self._next_reconnect = time.monotonic() + RAG_CONFIG.get("vector_store_retry_seconds", 60)
 
         # -------------------------------
         # 📚 Carrega e indexa documentos
         # -------------------------------
-        self._ensure_collection()
         self.documents = self._load_documents()
 
         if self.verbose:
             print(f"📁 {len(self.documents)} documentos encontrados.")
 
-        if self.documents:
-            self._index_documents()
+        # Sempre sincroniza: também remove pontos de arquivos apagados
+        self._index_documents()
 
     # ----------------------------------------------------
     # LEITURA DOS ARQUIVOS DA BASE
     # ----------------------------------------------------
     def _load_documents(self, base_dir: Optional[str] = None) -> List[Dict]:
         """
-        Lê todos os .txt da pasta base e retorna lista de dicts:
-        [{id, text, source}]
+        Lista todos os .txt da pasta base e retorna lista de dicts:
+        [{id, path, source, category, content_hash}]
+
+        O texto não é mantido em memória: os chunks são lidos do arquivo
+        sob demanda na indexação (ver _iter_chunks).
         """
         docs: List[Dict] = []
         base_path = Path(base_dir or self.knowledge_base_dir)
@@ -86,9 +268,7 @@ class QdrantRAG:
         for file in glob.glob(str(base_path / "**/*.txt"), recursive=True):
             path = Path(file)
             try:
-                with path.open("r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                if not content:
+                if path.stat().st_size == 0:
                     continue
 
                 # Extrai categoria do caminho (ex: suporte_tecnico/arquivo.txt -> suporte_tecnico)
@@ -98,9 +278,10 @@ class QdrantRAG:
                 docs.append(
                     {
                         "id": path.name,
-                        "text": content,
+                        "path": str(path),
                         "source": str(relative_path),
                         "category": category,
+                        "content_hash": content_hash(path, salt=self._index_signature()),
                     }
                 )
             except Exception as e:
@@ -109,69 +290,267 @@ class QdrantRAG:
         return docs
 
     # ----------------------------------------------------
-    # COLLECTION NO QDRANT
+    # CHUNKING
     # ----------------------------------------------------
-    def _ensure_collection(self):
-        collections = self.client.get_collections().collections
-        names = [c.name for c in collections]
+    def _index_signature(self) -> str:
+        """
+        Tudo o que muda os vetores gravados: modelo (mesmo com a mesma
+        dimensão), normalização L2 (ver _encode) e chunking efetivo.
+        """
+        size = effective_chunk_size(self.chunk_size, self.max_seq_length)
+        return f"model:{self.model_name}:l2norm:chunk:{size}:{self.chunk_overlap}"
+
+    def _iter_chunks(self, doc: Dict):
+        """Gera (chunk_index, texto) de um documento, lendo o arquivo em streaming."""
+        chunks = iter_file_chunks(
+            doc["path"],
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            max_seq_length=self.max_seq_length,
+        )
+        return enumerate(chunks)
 
-        if self.collection_name not in names:
-            if self.verbose:
-                print(
-                    f"🛠 Criando coleção '{self.collection_name}' "
-                    f"(dim={self.embedding_dim}) ..."
-                )
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=self.embedding_dim,
-                    distance=models.Distance.COSINE,
-                ),
-            )
-        else:
-            if self.verbose:
-                print(f"✔ Coleção '{self.collection_name}' já existe.")
+    # ----------------------------------------------------
+    # ARMAZENAMENTO DE VETORES
+    # ----------------------------------------------------
+    def _create_store(self) -> VectorStore:
+        """
+        Backend de RAG_CONFIG["vector_store"]: "qdrant" (padrão) ou "numpy",
+        já com a coleção garantida na dimensão do modelo.
+        Se o Qdrant não responder e vector_store_fallback estiver ligado,
+        cai para a busca exata local (NumPy) em vez de falhar.
+        """
+        backend = RAG_CONFIG.get("vector_store", "qdrant")
+        if backend == "numpy":
+            return self._numpy_store()
+
+        try:
+            if self.client is None:
+                self.client = create_qdrant_client(verbose=self.verbose)
+            store = create_qdrant_store(self.client, self.collection_name, verbose=self.verbose)
+            store.ensure(self.embedding_dim)
+            return store
+        except ValueError:
+            raise  # coleção incompatível com o modelo: não é falha de conexão
+        except Exception as e:
+            if not RAG_CONFIG.get("vector_store_fallback", True):
+                raise
+            print(f"⚠️ Qdrant indisponível ({e}). Usando busca local (NumPy) em modo degradado.")
+            if self._owns_client and self.client is not None:
+                try:
+                    self.client.close()
+                except Exception:
+                    pass
+                self.client = None
+            return self._numpy_store()
+
+    def _numpy_store(self) -> NumpyStore:
+        store = NumpyStore(
+            RAG_CONFIG.get("numpy_store_dir", "./rag/numpy_store"),
+            self.collection_name,
+            dtype=RAG_CONFIG.get("numpy_store_dtype", "float32"),
+            verbose=self.verbose,
+        )
+        store.ensure(self.embedding_dim)
+        return store
+
+    def _ensure_collection(self):
+        self.store.ensure(self.embedding_dim)
 
     # ----------------------------------------------------
-    # INDEXAÇÃO
+    # INDEXAÇÃO (incremental, endereçada por conteúdo)
     # ----------------------------------------------------
-    def _index_documents(self):
-        if not self.documents:
-            if self.verbose:
-                print("⚠️ Nenhum documento para indexar.")
-            return
+    def _indexed_sources(self, store: Optional[VectorStore] = None) -> Dict[str, Dict]:
+        """
+        Lê o que já está na coleção e agrupa por arquivo de origem:
+        {source: {"hashes": {content_hash, ...}, "chunk_counts": {n, ...},
+                  "ids": [point_id, ...]}}
 
-        if self.verbose:
-            print("⚙️ Indexando documentos no Qdrant...")
+        Pontos antigos (sem content_hash/chunk_count) aparecem com None e são
+        tratados como desatualizados.
+        """
+        return (store if store is not None else self.store).indexed_sources()
 
-        vectors = []
-        payloads = []
-        ids = []
+    @staticmethod
+    def _is_synced(entry: Dict, doc: Dict) -> bool:
+        """Arquivo já indexado por completo: só a versão atual e todos os seus chunks."""
+        return entry["hashes"] == {doc["content_hash"]} and entry["chunk_counts"] == {len(entry["ids"])}
 
-        start_id = self.count() + 1
+    def _index_documents(self, store: Optional[VectorStore] = None):
+        """
+        Sincroniza a coleção com self.documents:
+        - arquivos novos, alterados (hash diferente) ou incompletos (menos
+          pontos que o chunk_count gravado) são embedados e gravados;
+        - arquivos inalterados são ignorados (sem re-embed);
+        - arquivos removidos da pasta têm seus pontos apagados.
+
+        Os pontos novos são gravados antes de apagar os antigos: durante o
+        re-embed (ou se ele falhar) o arquivo continua com a versão anterior,
+        e a versão nova incompleta é descartada.
+        `store` permite sincronizar outro armazenamento antes de ativá-lo.
+        """
+        store = store if store is not None else self.store
+        indexed = self._indexed_sources(store)
+
+        current_sources = set()
+        to_index: List[Dict] = []
+        stale_by_source: Dict[str, List] = {}
+
+        for doc in self.documents:
+            source = doc.get("source", doc["id"])
+            current_sources.add(source)
+            entry = indexed.get(source)
+            if entry and self._is_synced(entry, doc):
+                continue
+            if entry:
+                stale_by_source[source] = entry["ids"]
+            to_index.append(doc)
+
+        for source, entry in indexed.items():
+            if source not in current_sources:
+                stale_by_source[source] = entry["ids"]
+
+        total = 0
+        written: Dict[str, List] = {}  # source -> ids gravados nesta sincronização
+        failed_sources: List[str] = []
+        if to_index:
+            if self.verbose:
+                print(f"⚙️ Indexando {len(to_index)} documentos novos/alterados ({store.name})...")
 
-        for i, doc in enumerate(self.documents):
-            emb = self.embedding_model.encode(doc["text"]).tolist()
-            vectors.append(emb)
-            payloads.append(
-                {
-                    "id": doc["id"],
-                    "text": doc["text"],
-                    "source": doc.get("source", doc["id"]),
-                    "category": doc.get("category", "geral"),
-                    "file_type": "txt",
-                    "chunk_index": 0,
-                }
-            )
-            ids.append(start_id + i)
+            expected: Dict[str, int] = {}
+            batch: List = []
+            try:
+                for item in self._iter_points(to_index, failed_sources):
+                    expected[item[2]["source"]] = item[2]["chunk_count"]
+                    batch.append(item)
+                    if len(batch) >= self.upsert_batch_size:
+                        total += self._write_batch(batch, store, written)
+                        batch = []
+                if batch:
+                    total += self._write_batch(batch, store, written)
+
+                # Erro de leitura no meio do arquivo: descarta só a versão nova
+                for source in failed_sources:
+                    ids = written.pop(source, [])
+                    if ids:
+                        store.delete_ids(ids)
+                        total -= len(ids)
+            except Exception:
+                # Embed/gravação falhou: remove as versões novas incompletas
+                # (as anteriores continuam valendo)
+                for source, ids in written.items():
+                    if len(ids) < expected.get(source, 0):
+                        store.delete_ids(ids)
+                raise
+            finally:
+                # Mesmo em falha parcial a coleção mudou: invalida resultados em cache
+                store.flush()
+                self._bump_generation()
+
+        # Só depois da nova versão gravada: remove as versões antigas (exceto
+        # de arquivos cuja versão nova falhou na leitura)
+        new_ids = {pid for ids in written.values() for pid in ids}
+        stale_ids = [
+            pid
+            for source, ids in stale_by_source.items()
+            if source not in failed_sources
+            for pid in ids
+            if pid not in new_ids
+        ]
+        if stale_ids:
+            store.delete_ids(stale_ids)
+            store.flush()
+            self._bump_generation()
+            if self.verbose:
+                print(f"🗑 {len(stale_ids)} pontos desatualizados removidos.")
 
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=models.Batch(ids=ids, vectors=vectors, payloads=payloads),
-        )
+        if not to_index:
+            if self.verbose:
+                print("✔ Coleção já está sincronizada com a base. Nada a indexar.")
+            return
 
         if self.verbose:
-            print(f"✅ {len(vectors)} documentos indexados com sucesso.")
+            ok = len(to_index) - len(set(failed_sources))
+            print(f"✅ {total} chunks de {ok} documentos indexados com sucesso.")
+
+    def _iter_points(self, docs: List[Dict], failed_sources: List[str]):
+        """
+        Gera (id, texto, payload) de todos os chunks dos documentos, sob demanda.
+        Uma passada prévia (sem embed) conta os chunks: o chunk_count no
+        payload permite detectar arquivos indexados só em parte.
+        """
+        for doc in docs:
+            source = doc.get("source", doc["id"])
+            try:
+                chunk_count = sum(1 for _ in self._iter_chunks(doc))
+                for chunk_index, text in self._iter_chunks(doc):
+                    payload = {
+                        "id": doc["id"],
+                        "text": text,
+                        "source": source,
+                        "category": doc.get("category", "geral"),
+                        "file_type": "txt",
+                        "chunk_index": chunk_index,
+                        "chunk_count": chunk_count,
+                        "content_hash": doc["content_hash"],
+                    }
+                    yield point_id(source, doc["content_hash"], chunk_index), text, payload
+            except Exception as e:
+                print(f"⚠️ Erro lendo {doc.get('path', source)}: {e}")
+                failed_sources.append(source)
+
+    def _write_batch(self, batch: List, store: VectorStore, written: Dict[str, List]) -> int:
+        """_upsert_batch registrando, por arquivo, os ids efetivamente gravados."""
+        n = self._upsert_batch(batch, store)
+        for pid, _, payload in batch:
+            written.setdefault(payload["source"], []).append(pid)
+        return n
+
+    def _upsert_batch(self, batch: List, store: Optional[VectorStore] = None) -> int:
+        """Embeda um lote de chunks em uma única chamada e grava no armazenamento."""
+        ids, texts, payloads = zip(*batch)
+        vectors = self._embed(list(texts))
+        (store if store is not None else self.store).upsert(list(ids), vectors, list(payloads))
+        return len(ids)
+
+    # ----------------------------------------------------
+    # EMBEDDINGS
+    # ----------------------------------------------------
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeda vários textos, consultando antes o cache em disco; só os
+        textos ausentes do cache passam pelo modelo.
+        """
+        if self.embedding_cache is None:
+            return self._encode(texts)
+
+        keys = [text_key(t) for t in texts]
+        cached = self.embedding_cache.get_many(keys)
+        missing = [i for i in range(len(texts)) if i not in cached]
+
+        vectors = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        for i, vec in cached.items():
+            vectors[i] = vec
+        if missing:
+            encoded = self._encode([texts[i] for i in missing])
+            vectors[missing] = encoded
+            self.embedding_cache.put_many([keys[i] for i in missing], encoded)
+        return vectors
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeda vários textos de uma vez (o SentenceTransformer agrupa em
+        batches e ordena por tamanho internamente) e normaliza em bloco.
+        """
+        vectors = self.embedding_model.encode(
+            texts,
+            batch_size=self.embedding_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        ).astype(np.float32, copy=False)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
 
     # ----------------------------------------------------
     # API USADA PELO app_01.py
@@ -187,57 +566,75 @@ class QdrantRAG:
         Método chamado em app_01.py → rag_instance.retrieve(...)
         Retorna lista de documentos com: text, source, category, score.
         """
-        query_emb = self.embedding_model.encode(query).tolist()
-
-        # Implementa filtro por categoria usando Qdrant Filter
-        q_filter = None
-        if category_filter:
-            q_filter = models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="category",
-                        match=models.MatchValue(value=category_filter)
-                    )
-                ]
-            )
+        cache_key = (
+            self._generation,
+            normalize_query(query),
+            int(top_k),
+            float(score_threshold),
+            category_filter,
+        )
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return [dict(d) for d in cached]
+
+        query_emb = self._embed_query(query)
 
-        results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=query_emb,
-            limit=top_k,
+        # Filtro por categoria: Filter no Qdrant, máscara por categoria no NumPy
+        results = self.store.search(
+            query_emb,
+            top_k=top_k,
             score_threshold=score_threshold,
-            query_filter=q_filter,
+            category_filter=category_filter,
         )
 
         docs: List[Dict] = []
-        for r in results:
-            payload = r.payload or {}
+        for score, payload in results:
             docs.append(
                 {
                     "text": payload.get("text", ""),
                     "source": payload.get("source", payload.get("id", "Desconhecido")),
                     "category": payload.get("category", "geral"),
                     "file_type": payload.get("file_type", "txt"),
-                    "score": float(r.score),
+                    "score": float(score),
                     "chunk_index": payload.get("chunk_index", 0),
                 }
             )
+
+        self._result_cache.put(cache_key, [dict(d) for d in docs])
         return docs
 
+    def _bump_generation(self):
+        """Marca que a coleção mudou (invalida o cache de resultados)."""
+        self._generation += 1
+        self._result_cache.clear()
+
+    def _embed_query(self, query: str) -> List[float]:
+        """
+        Embedding da consulta, reaproveitando o cache LRU do processo.
+        O modelo recebe o mesmo texto usado na chave do cache.
+        """
+        text = normalize_query(query)
+        key = (self.model_name, text)
+        emb = _QUERY_EMBEDDING_CACHE.get(key)
+        if emb is None:
+            emb = self._encode([text])[0].tolist()
+            _QUERY_EMBEDDING_CACHE.put(key, emb)
+        return emb
+
     def count(self) -> int:
         """Usado no app_01.py para mostrar quantidade de documentos."""
         try:
-            info = self.client.get_collection(self.collection_name)
-            return int(info.points_count or 0)
+            return self.store.count()
         except Exception:
             return 0
 
     def clear(self):
         """Usado no botão '🔄 Recarregar' da sidebar."""
         try:
-            self.client.delete_collection(self.collection_name)
+            self.store.drop()
         except Exception:
             pass
+        self._bump_generation()
         self._ensure_collection()
 
     def load_documents(self, dir_path: Optional[str] = None):
@@ -252,8 +649,7 @@ class QdrantRAG:
         self.documents = self._load_documents()
         if self.verbose:
             print(f"📁 Recarregados {len(self.documents)} documentos.")
-        if self.documents:
-            self._index_documents()
+        self._index_documents()
 
     def get_stats(self) -> Dict:
         """
@@ -264,11 +660,15 @@ class QdrantRAG:
         total = self.count()
         return {
             "collection_name": self.collection_name,
+            "vector_store": self.store.name,
             "total_documents": total,
             "categories": ["geral"],
             "category_counts": {"geral": total},
             "embedding_model": self.embedding_model.__class__.__name__,
             "embedding_dim": self.embedding_dim,
+            "embedding_cache": self.embedding_cache.get_stats() if self.embedding_cache else None,
+            "query_cache": _QUERY_EMBEDDING_CACHE.get_stats(),
+            "result_cache": {**self._result_cache.get_stats(), "generation": self._generation},
         }
 
     # ----------------------------------------------------
@@ -277,9 +677,79 @@ class QdrantRAG:
     def is_empty(self) -> bool:
         return self.count() == 0
 
+    def health_check(self) -> bool:
+        """
+        True se o armazenamento responde (no Qdrant: a coleção existe).
+        Em modo degradado (NumPy por falha do Qdrant) a instância segue
+        saudável e tenta voltar ao Qdrant no máximo a cada
+        vector_store_retry_seconds, sem ser descartada e recriada.
+        Não bloqueia: a reconexão e a ressincronização rodam em segundo plano.
+        """
+        if self.degraded:
+            self._schedule_reconnect()
+        return self.store.healthy()
+
+    @property
+    def degraded(self) -> bool:
+        """True quando o Qdrant está configurado mas a busca usa o NumPy (fallback)."""
+        return self.store.name == "numpy" and RAG_CONFIG.get("vector_store", "qdrant") != "numpy"
+
+    def _schedule_reconnect(self) -> bool:
+        """Dispara _try_reconnect numa thread daemon se já for hora e nenhuma estiver rodando."""
+        if time.monotonic() < self._next_reconnect:
+            return False
+        thread = self._reconnect_thread
+        if thread is not None and thread.is_alive():
+            return False
+        self._reconnect_thread = threading.Thread(
+            target=self._try_reconnect, name="rag-reconnect", daemon=True
+        )
+        self._reconnect_thread.start()
+        return True
+
+    def _try_reconnect(self) -> bool:
+        """Volta ao Qdrant se ele responder; a coleção é sincronizada de forma incremental."""
+        if time.monotonic() < self._next_reconnect or not self._reconnect_lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_reconnect = time.monotonic() + RAG_CONFIG.get("vector_store_retry_seconds", 60)
+            try:
+                if self.client is None:
+                    self.client = create_qdrant_client(verbose=self.verbose)
+                    self._owns_client = True
+                store = create_qdrant_store(self.client, self.collection_name, verbose=self.verbose)
+                store.ensure(self.embedding_dim)
+            except Exception as e:
+                if self.verbose:
+                    print(f"⚠️ Qdrant ainda indisponível: {e}")
+                if self._owns_client and self.client is not None:
+                    try:
+                        self.client.close()
+                    except Exception:
+                        pass
+                    self.client = None
+                return False
+
+            try:
+                # Sincroniza antes de trocar: as buscas seguem no NumPy até o fim
+                self._index_documents(store)
+            except Exception as e:
+                print(f"⚠️ Falha ao sincronizar o Qdrant, mantendo o modo local: {e}")
+                return False
+            degraded_store, self.store = self.store, store
+            self._bump_generation()
+            degraded_store.close()
+            print("✅ Qdrant de volta: RAG saiu do modo degradado (NumPy).")
+            return True
+        finally:
+            self._reconnect_lock.release()
+
     def close(self):
+        # Cliente compartilhado é fechado por quem o criou
+        if not getattr(self, "_owns_client", True):
+            return
         try:
-            if hasattr(self, "client") and self.client:
+            if getattr(self, "client", None) is not None:
                 self.client.close()
         except Exception:
             pass
@@ -291,12 +761,14 @@ class QdrantRAG:
 def create_rag_instance(
     knowledge_base_dir: str = "./rag/base_conhecimento",
     verbose: bool = True,
+    client: Optional[QdrantClient] = None,
 ) -> Optional[QdrantRAG]:
     try:
         rag = QdrantRAG(
             knowledge_base_dir=knowledge_base_dir,
             collection_name="rag_collection",
             verbose=verbose,
+            client=client,
         )
         return rag
     except Exception as e:
@@ -0,0 +1,618 @@
+"""
+Armazenamento de vetores do sistema RAG
+
+O QdrantRAG conversa só com esta interface (VectorStore); o backend é
+escolhido por RAG_CONFIG["vector_store"]:
+
+QdrantStore: coleção no Qdrant (servidor ou embutido, ver create_qdrant_client).
+
+NumpyStore: busca exata em processo, para bases pequenas (alguns milhares
+de chunks), onde uma multiplicação de matriz é mais rápida que uma ida e
+volta pela rede. Também é o modo degradado quando o Qdrant não responde.
+
+Layout em disco do NumpyStore (uma pasta por coleção):
+    <store_dir>/<coleção>/vectors.npy      # matriz [n, dim] (float32 ou float16)
+    <store_dir>/<coleção>/payloads.jsonl   # {"id": ..., "payload": {...}} por linha
+
+A matriz é lida via memory-map; o filtro por categoria usa uma máscara
+booleana por categoria e o top-k sai de np.argpartition.
+"""
+
+import json
+import os
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+# (score, payload) de cada resultado da busca
+SearchResult = Tuple[float, Dict]
+
+
+class VectorStore:
+    """Interface comum dos backends de vetores."""
+
+    name = "base"
+
+    def ensure(self, dim: int):
+        """Cria a coleção (dimensão `dim`) se ainda não existir."""
+        raise NotImplementedError
+
+    def indexed_sources(self) -> Dict[str, Dict]:
+        """{source: {"hashes": {content_hash, ...}, "chunk_counts": {n, ...}, "ids": [point_id, ...]}}"""
+        raise NotImplementedError
+
+    def upsert(self, ids: Sequence, vectors: np.ndarray, payloads: Sequence[Dict]):
+        raise NotImplementedError
+
+    def delete_ids(self, ids: Sequence):
+        raise NotImplementedError
+
+    def delete_source(self, source: str):
+        raise NotImplementedError
+
+    def search(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        score_threshold: float,
+        category_filter: Optional[str] = None,
+    ) -> List[SearchResult]:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def drop(self):
+        """Apaga a coleção inteira."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Persiste alterações pendentes (no-op quando a escrita é imediata)."""
+
+    def healthy(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+
+# ═══════════════════════════════════════════════════════
+# Qdrant
+# ═══════════════════════════════════════════════════════
+
+# Quantização dos vetores no Qdrant (RAM por vetor de dim d):
+# "none" = float32 (4d bytes) | "scalar" = int8 (d bytes, ~4x menos)
+# "binary" = 1 bit/dim (d/8 bytes, ~32x menos; bom p/ modelos com >= 768 dims)
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+
+class QdrantStore(VectorStore):
+    name = "qdrant"
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        verbose: bool = True,
+        payload_indexes: Sequence[str] = (),
+        quantization: str = "none",
+        quantization_always_ram: bool = True,
+        quantization_oversampling: float = 2.0,
+        quantization_rescore: bool = True,
+        vectors_on_disk: Optional[bool] = None,
+        payload_on_disk: Optional[bool] = None,
+        hnsw_on_disk: Optional[bool] = None,
+        embedded: bool = False,
+    ):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Quantização inválida: {quantization!r} (use {', '.join(QUANTIZATION_MODES)})"
+            )
+        self.client = client
+        self.collection_name = collection_name
+        self.verbose = verbose
+        self.payload_indexes = tuple(payload_indexes)
+        self.quantization = quantization
+        self.quantization_always_ram = quantization_always_ram
+        self.quantization_oversampling = quantization_oversampling
+        self.quantization_rescore = quantization_rescore
+        # None = mantém o padrão do servidor Qdrant
+        self.vectors_on_disk = vectors_on_disk
+        self.payload_on_disk = payload_on_disk
+        self.hnsw_on_disk = hnsw_on_disk
+        # Qdrant embutido (QDRANT_MODE=local/memory): ignora índices de payload,
+        # quantização e armazenamento em disco
+        self.embedded = embedded
+        if verbose and vectors_on_disk and quantization == "none":
+            print("⚠️ Vetores em disco sem quantização: toda busca lê do disco (use quantization='scalar').")
+
+    def ensure(self, dim: int):
+        collections = self.client.get_collections().collections
+        names = [c.name for c in collections]
+
+        if self.collection_name not in names:
+            if self.verbose:
+                print(f"🛠 Criando coleção '{self.collection_name}' (dim={dim}) ...")
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=models.VectorParams(
+                    size=dim,
+                    distance=models.Distance.COSINE,
+                    on_disk=self.vectors_on_disk,
+                ),
+                quantization_config=self._quantization_config(),
+                on_disk_payload=self.payload_on_disk,
+                hnsw_config=(
+                    models.HnswConfigDiff(on_disk=self.hnsw_on_disk)
+                    if self.hnsw_on_disk is not None
+                    else None
+                ),
+            )
+        else:
+            if self.verbose:
+                print(f"✔ Coleção '{self.collection_name}' já existe.")
+            info = self.client.get_collection(self.collection_name)
+            vetores = info.config.params.vectors
+            atual = vetores.size if isinstance(vetores, models.VectorParams) else None
+            if atual is not None and atual != dim:
+                raise ValueError(
+                    f"Coleção '{self.collection_name}' tem vetores de {atual} dimensões, "
+                    f"mas o modelo de embeddings gera {dim}. Apague a coleção no Qdrant "
+                    f"ou use outro collection_name."
+                )
+            # Coleção antiga com outra configuração: ajusta no lugar (o
+            # Qdrant no modo embutido ignora quantização e armazenamento)
+            if not self.embedded:
+                self._ensure_quantization(info)
+                self._ensure_storage(info)
+
+        self._ensure_payload_indexes()
+
+    # ----------------------------------------------------
+    # Quantização
+    # ----------------------------------------------------
+    def _quantization_config(self):
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=self.quantization_always_ram,
+                )
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=self.quantization_always_ram)
+            )
+        return None
+
+    def _ensure_quantization(self, info):
+        """
+        Coleção existente com outra quantização: ajusta via update_collection.
+        O Qdrant requantiza a partir dos vetores originais (sem re-embedar).
+        """
+        atual = info.config.quantization_config
+        if isinstance(atual, models.ScalarQuantization):
+            modo_atual = "scalar"
+        elif isinstance(atual, models.BinaryQuantization):
+            modo_atual = "binary"
+        elif atual is None:
+            modo_atual = "none"
+        else:
+            modo_atual = type(atual).__name__
+        if modo_atual == self.quantization:
+            return
+        if self.verbose:
+            print(f"🔁 Quantização da coleção: {modo_atual} → {self.quantization} ...")
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            quantization_config=self._quantization_config() or models.Disabled.DISABLED,
+        )
+
+    # ----------------------------------------------------
+    # Armazenamento (RAM x disco)
+    # ----------------------------------------------------
+    def _ensure_storage(self, info):
+        """
+        Aplica on_disk (vetores e HNSW) e on_disk_payload numa coleção
+        existente via update_collection; o Qdrant regrava os segmentos com os
+        mesmos vetores (sem re-embedar). on_disk_payload só vale para segmentos
+        novos: para converter tudo, use rag/utils/migrar_colecao.py.
+        """
+        params = info.config.params
+        mudancas = {}
+        vetores = params.vectors
+        if (
+            self.vectors_on_disk is not None
+            and isinstance(vetores, models.VectorParams)
+            and bool(vetores.on_disk) != self.vectors_on_disk
+        ):
+            mudancas["vectors_config"] = {"": models.VectorParamsDiff(on_disk=self.vectors_on_disk)}
+        if self.payload_on_disk is not None and bool(params.on_disk_payload) != self.payload_on_disk:
+            mudancas["collection_params"] = models.CollectionParamsDiff(on_disk_payload=self.payload_on_disk)
+        if self.hnsw_on_disk is not None and bool(info.config.hnsw_config.on_disk) != self.hnsw_on_disk:
+            mudancas["hnsw_config"] = models.HnswConfigDiff(on_disk=self.hnsw_on_disk)
+        if not mudancas:
+            return
+        if self.verbose:
+            print(f"🔁 Armazenamento da coleção: ajustando {', '.join(mudancas)} ...")
+        self.client.update_collection(collection_name=self.collection_name, **mudancas)
+
+    def _search_params(self) -> Optional[models.SearchParams]:
+        """Com quantização: busca nos vetores quantizados com oversampling e rescore nos originais."""
+        if self.quantization == "none":
+            return None
+        return models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                rescore=self.quantization_rescore,
+                oversampling=self.quantization_oversampling,
+            )
+        )
+
+    # ----------------------------------------------------
+    # Índices de payload
+    # ----------------------------------------------------
+    def _ensure_payload_indexes(self):
+        """
+        Índices keyword nos campos filtrados (category, source, ...). Com eles
+        o Qdrant estima a cardinalidade do filtro e escolhe entre o HNSW
+        filtrável (links extras por valor, criados junto com o grafo) e a busca
+        exata só nos pontos do filtro, em vez de varrer payloads. Criados logo
+        após a coleção, antes do upload, para o HNSW já nascer com esses links.
+        """
+        if not self.payload_indexes or self.embedded:
+            return  # o Qdrant embutido não usa índices de payload
+        info = self.client.get_collection(self.collection_name)
+        existentes = set((info.payload_schema or {}).keys())
+        for campo in self.payload_indexes:
+            if campo in existentes:
+                continue
+            if self.verbose:
+                print(f"🗂 Criando índice de payload '{campo}' (keyword) ...")
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=campo,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+                wait=True,
+            )
+
+    def indexed_sources(self) -> Dict[str, Dict]:
+        # Pontos antigos (sem content_hash) aparecem com hash None
+        indexed: Dict[str, Dict] = {}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=512,
+                offset=offset,
+                with_payload=["source", "id", "content_hash", "chunk_count"],
+                with_vectors=False,
+            )
+            for p in points:
+                payload = p.payload or {}
+                source = payload.get("source", payload.get("id"))
+                entry = indexed.setdefault(source, {"hashes": set(), "chunk_counts": set(), "ids": []})
+                entry["hashes"].add(payload.get("content_hash"))
+                entry["chunk_counts"].add(payload.get("chunk_count"))
+                entry["ids"].append(p.id)
+            if offset is None:
+                break
+        return indexed
+
+    def upsert(self, ids: Sequence, vectors: np.ndarray, payloads: Sequence[Dict]):
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=models.Batch(
+                ids=list(ids),
+                vectors=np.asarray(vectors, dtype=np.float32).tolist(),
+                payloads=list(payloads),
+            ),
+        )
+
+    def delete_ids(self, ids: Sequence):
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=list(ids)),
+        )
+
+    def delete_source(self, source: str):
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(
+                    must=[models.FieldCondition(key="source", match=models.MatchValue(value=source))]
+                )
+            ),
+        )
+
+    def search(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        score_threshold: float,
+        category_filter: Optional[str] = None,
+    ) -> List[SearchResult]:
+        q_filter = None
+        if category_filter:
+            q_filter = models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="category",
+                        match=models.MatchValue(value=category_filter)
+                    )
+                ]
+            )
+
+        results = self.client.search(
+            collection_name=self.collection_name,
+            query_vector=list(vector),
+            limit=top_k,
+            score_threshold=score_threshold,
+            query_filter=q_filter,
+            search_params=self._search_params(),
+        )
+        return [(float(r.score), r.payload or {}) for r in results]
+
+    def count(self) -> int:
+        info = self.client.get_collection(self.collection_name)
+        return int(info.points_count or 0)
+
+    def drop(self):
+        self.client.delete_collection(self.collection_name)
+
+    def healthy(self) -> bool:
+        try:
+            self.client.get_collection(self.collection_name)
+            return True
+        except Exception:
+            return False
+
+    def wait_until_indexed(self, timeout: float = 600.0) -> bool:
+        """Espera o otimizador terminar (status green); False se estourar o timeout."""
+        inicio = time.time()
+        while time.time() - inicio < timeout:
+            info = self.client.get_collection(self.collection_name)
+            if info.status == models.CollectionStatus.GREEN:
+                return True
+            time.sleep(1)
+        print(f"⚠️ Timeout esperando '{self.collection_name}' ficar green.")
+        return False
+
+    def close(self):
+        self.client.close()
+
+
+# ═══════════════════════════════════════════════════════
+# NumPy (busca exata em processo)
+# ═══════════════════════════════════════════════════════
+
+class _EstadoNumpy(NamedTuple):
+    """
+    Versão publicada do índice, lida de uma vez pelas buscas. As listas de
+    ids/payloads só crescem no fim (ou são trocadas por novas), então ler as
+    primeiras `n` posições é sempre consistente com `vectors` e `categorias`.
+    """
+
+    n: int
+    vectors: np.ndarray
+    ids: List
+    payloads: List[Dict]
+    categorias: Dict[str, np.ndarray]
+
+
+class NumpyStore(VectorStore):
+    name = "numpy"
+
+    def __init__(
+        self,
+        store_dir: str,
+        collection_name: str,
+        dtype: str = "float32",
+        verbose: bool = True,
+    ):
+        self.path = Path(store_dir) / collection_name
+        self.collection_name = collection_name
+        self.dtype = np.dtype(dtype)
+        self.verbose = verbose
+
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        # Buffers em RAM com folga (crescem em dobro): o estado publicado é uma
+        # fatia deles e novos lotes são escritos após o fim, sem copiar o índice
+        self._buffer: Optional[np.ndarray] = None
+        self._mascaras_buf: Dict[str, np.ndarray] = {}
+        self._ids_set: set = set()  # ids presentes (upsert sem varrer a lista)
+        self._dirty = False
+        self._reset(np.zeros((0, 0), dtype=self.dtype), [], [])
+
+    # ----------------------------------------------------
+    # Arquivos
+    # ----------------------------------------------------
+    @property
+    def _vectors_file(self) -> Path:
+        return self.path / "vectors.npy"
+
+    @property
+    def _payloads_file(self) -> Path:
+        return self.path / "payloads.jsonl"
+
+    def _load(self):
+        vectors = np.zeros((0, self._dim), dtype=self.dtype)
+        ids: List = []
+        payloads: List[Dict] = []
+        if self._vectors_file.exists() and self._payloads_file.exists():
+            try:
+                with self._payloads_file.open("r", encoding="utf-8") as f:
+                    for linha in f:
+                        item = json.loads(linha)
+                        ids.append(item["id"])
+                        payloads.append(item["payload"])
+                vectors = np.load(self._vectors_file, mmap_mode="r")
+                if vectors.shape != (len(ids), self._dim) or vectors.dtype != self.dtype:
+                    raise ValueError("arquivos inconsistentes com a configuração")
+            except Exception as e:
+                # Dimensão/dtype mudou ou escrita interrompida: recomeça do zero
+                if self.verbose:
+                    print(f"⚠️ Índice NumPy descartado ({e}).")
+                vectors = np.zeros((0, self._dim), dtype=self.dtype)
+                ids, payloads = [], []
+        self._reset(vectors, ids, payloads)
+
+    def _reset(self, vectors: np.ndarray, ids: List, payloads: List[Dict], buffer: Optional[np.ndarray] = None):
+        """Publica um índice novo (listas próprias, máscaras recalculadas)."""
+        self._buffer = buffer
+        rotulos = np.asarray([p.get("category", "geral") for p in payloads], dtype=object)
+        self._mascaras_buf = {c: rotulos == c for c in set(rotulos)}
+        self._ids_set = set(ids)
+        self._publish(vectors, ids, payloads)
+
+    def _publish(self, vectors: np.ndarray, ids: List, payloads: List[Dict]):
+        n = len(ids)
+        categorias = {c: m[:n] for c, m in self._mascaras_buf.items()}
+        # Uma única atribuição: buscas em andamento seguem com o estado anterior
+        self._estado = _EstadoNumpy(n, vectors, ids, payloads, categorias)
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.mkdir(parents=True, exist_ok=True)
+            estado = self._estado
+            tmp_vectors = self.path / "vectors.tmp.npy"
+            tmp_payloads = self.path / "payloads.tmp"
+            np.save(tmp_vectors, np.ascontiguousarray(estado.vectors, dtype=self.dtype))
+            with tmp_payloads.open("w", encoding="utf-8") as f:
+                for pid, payload in zip(estado.ids, estado.payloads):
+                    f.write(json.dumps({"id": pid, "payload": payload}, ensure_ascii=False) + "\n")
+            if isinstance(estado.vectors, np.memmap):
+                # Libera o memory-map antes de substituir o arquivo (Windows)
+                self._publish(np.array(estado.vectors), estado.ids, estado.payloads)
+            os.replace(tmp_vectors, self._vectors_file)
+            os.replace(tmp_payloads, self._payloads_file)
+            self._dirty = False
+            # Volta a ler via memory-map (não mantém a cópia em RAM)
+            self._buffer = None
+            self._publish(np.load(self._vectors_file, mmap_mode="r"), estado.ids, estado.payloads)
+
+    # ----------------------------------------------------
+    # API
+    # ----------------------------------------------------
+    def ensure(self, dim: int):
+        with self._lock:
+            if self._dim == int(dim):
+                return
+            self._dim = int(dim)
+            self._load()
+        if self.verbose:
+            print(f"✔ Índice NumPy '{self.collection_name}': {self.count()} vetores ({self.dtype}).")
+
+    def indexed_sources(self) -> Dict[str, Dict]:
+        estado = self._estado
+        indexed: Dict[str, Dict] = {}
+        for pid, payload in islice(zip(estado.ids, estado.payloads), estado.n):
+            source = payload.get("source", payload.get("id"))
+            entry = indexed.setdefault(source, {"hashes": set(), "chunk_counts": set(), "ids": []})
+            entry["hashes"].add(payload.get("content_hash"))
+            entry["chunk_counts"].add(payload.get("chunk_count"))
+            entry["ids"].append(pid)
+        return indexed
+
+    def _remove(self, manter: np.ndarray):
+        estado = self._estado
+        if manter.all():
+            return
+        vectors = np.asarray(estado.vectors)[manter]
+        ids = [pid for pid, m in zip(estado.ids, manter) if m]
+        payloads = [p for p, m in zip(estado.payloads, manter) if m]
+        # Cópia nova em RAM: vira o buffer dos próximos lotes
+        self._reset(vectors, ids, payloads, buffer=vectors)
+        self._dirty = True
+
+    def _crescer(self, n: int, b: int):
+        """Garante espaço para mais b linhas nos buffers (O(lote) amortizado)."""
+        if self._buffer is not None and len(self._buffer) >= n + b:
+            return
+        capacidade = max(n + b, 2 * n, 1024)
+        buffer = np.empty((capacidade, self._dim), dtype=self.dtype)
+        buffer[:n] = self._estado.vectors
+        self._buffer = buffer
+        for categoria, mascara in self._mascaras_buf.items():
+            maior = np.zeros(capacidade, dtype=bool)
+            maior[:n] = mascara[:n]
+            self._mascaras_buf[categoria] = maior
+
+    def upsert(self, ids: Sequence, vectors: np.ndarray, payloads: Sequence[Dict]):
+        with self._lock:
+            novos = set(ids)
+            if not novos.isdisjoint(self._ids_set):
+                self._remove(np.asarray([pid not in novos for pid in self._estado.ids], dtype=bool))
+            estado = self._estado
+            n, b = estado.n, len(ids)
+            self._crescer(n, b)
+            self._buffer[n:n + b] = np.asarray(vectors, dtype=self.dtype)
+            rotulos = np.asarray([p.get("category", "geral") for p in payloads], dtype=object)
+            for categoria in set(rotulos) - set(self._mascaras_buf):
+                self._mascaras_buf[categoria] = np.zeros(len(self._buffer), dtype=bool)
+            for categoria, mascara in self._mascaras_buf.items():
+                mascara[n:n + b] = rotulos == categoria
+            # Só acrescenta no fim: leitores do estado anterior não enxergam as novas posições
+            estado.ids.extend(ids)
+            estado.payloads.extend(dict(p) for p in payloads)
+            self._ids_set.update(ids)
+            self._publish(self._buffer[:n + b], estado.ids, estado.payloads)
+            self._dirty = True
+
+    def delete_ids(self, ids: Sequence):
+        remover = set(ids)
+        with self._lock:
+            self._remove(np.asarray([pid not in remover for pid in self._estado.ids], dtype=bool))
+
+    def delete_source(self, source: str):
+        with self._lock:
+            self._remove(np.asarray([p.get("source") != source for p in self._estado.payloads], dtype=bool))
+
+    def search(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        score_threshold: float,
+        category_filter: Optional[str] = None,
+    ) -> List[SearchResult]:
+        n, vectors, _, payloads, categorias = self._estado
+        if n == 0 or top_k <= 0:
+            return []
+
+        # Vetores normalizados: produto interno = similaridade de cosseno
+        # (float16 é convertido para float32 no produto)
+        scores = np.asarray(vectors @ np.asarray(vector, dtype=np.float32), dtype=np.float32)
+        if category_filter:
+            mascara = categorias.get(category_filter)
+            if mascara is None:
+                return []
+            scores = np.where(mascara, scores, -np.inf)
+
+        k = min(int(top_k), n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), payloads[i]) for i in top if scores[i] >= score_threshold]
+
+    def count(self) -> int:
+        return self._estado.n
+
+    def drop(self):
+        with self._lock:
+            # Solta o memory-map antes de apagar os arquivos (Windows)
+            self._reset(np.zeros((0, self._dim or 0), dtype=self.dtype), [], [])
+            for f in (self._vectors_file, self._payloads_file):
+                try:
+                    f.unlink(missing_ok=True)
+                except OSError:
+                    pass
+            self._dim = None
+            self._dirty = False
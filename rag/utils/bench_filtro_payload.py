@@ -0,0 +1,121 @@
+"""
+Benchmark - Busca filtrada por categoria com e sem índice de payload
+Cria uma coleção sintética (vetores aleatórios normalizados, categorias
+como as dos USE_CASES) e mede a latência da busca:
+  1. sem filtro;
+  2. com filtro de categoria, sem índice de payload;
+  3. com filtro de categoria, com índice keyword (category/source/file_type).
+
+Uso: python rag/utils/bench_filtro_payload.py [--pontos 100000] [--consultas 200]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Adiciona o diretório raiz ao path
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from qdrant_client.http import models  # noqa: E402
+
+from rag.rag_module import create_qdrant_client, qdrant_mode  # noqa: E402
+from rag.rag_store import QdrantStore  # noqa: E402
+
+# Distribuição das categorias (uma rara, para o filtro ser seletivo)
+CATEGORIAS = {"suporte_tecnico": 0.6, "relacionamento": 0.35, "geral": 0.05}
+CAMPOS_INDICE = ("category", "source", "file_type")
+
+
+def vetores_aleatorios(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    v = rng.standard_normal((n, dim), dtype=np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def criar_colecao(client, colecao: str, n: int, dim: int, lote: int, rng: np.random.Generator):
+    if client.collection_exists(colecao):
+        client.delete_collection(colecao)
+    client.create_collection(
+        collection_name=colecao,
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+    )
+    nomes = list(CATEGORIAS)
+    pesos = np.asarray(list(CATEGORIAS.values()))
+    for inicio in range(0, n, lote):
+        fim = min(n, inicio + lote)
+        categorias = rng.choice(nomes, size=fim - inicio, p=pesos / pesos.sum())
+        client.upsert(
+            collection_name=colecao,
+            points=models.Batch(
+                ids=list(range(inicio, fim)),
+                vectors=vetores_aleatorios(fim - inicio, dim, rng).tolist(),
+                payloads=[
+                    {"category": str(c), "source": f"{c}/doc_{i % 500}.txt", "file_type": "txt"}
+                    for i, c in zip(range(inicio, fim), categorias)
+                ],
+            ),
+            wait=True,
+        )
+        print(f"\r📤 {fim}/{n} pontos", end="", flush=True)
+    print()
+
+
+def medir(store: QdrantStore, consultas: np.ndarray, categoria=None, top_k: int = 3):
+    tempos = []
+    for q in consultas:
+        inicio = time.perf_counter()
+        store.search(q, top_k=top_k, score_threshold=0.0, category_filter=categoria)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    t = np.asarray(tempos)
+    return {"p50": np.percentile(t, 50), "p95": np.percentile(t, 95), "media": t.mean()}
+
+
+def imprimir(rotulo: str, r: dict):
+    print(f"  {rotulo:<44} p50 {r['p50']:7.2f} ms   p95 {r['p95']:7.2f} ms   média {r['media']:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pontos", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--colecao", default="bench_filtro_payload")
+    parser.add_argument("--manter", action="store_true", help="Não apaga a coleção ao final")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    client = create_qdrant_client()
+    print(f"🛠 Criando '{args.colecao}' com {args.pontos} pontos (dim={args.dim}) ...")
+    criar_colecao(client, args.colecao, args.pontos, args.dim, args.lote, rng)
+    store = QdrantStore(client, args.colecao, verbose=False, embedded=qdrant_mode() != "server")
+    store.wait_until_indexed()
+
+    consultas = vetores_aleatorios(args.consultas, args.dim, rng)
+    if store.embedded:
+        print("⚠️ Qdrant embutido: índices de payload não têm efeito aqui (use QDRANT_MODE=server).")
+
+    print("\n⏱️ Sem índice de payload")
+    imprimir("sem filtro", medir(store, consultas))
+    for categoria in CATEGORIAS:
+        imprimir(f"category = {categoria} ({CATEGORIAS[categoria]:.0%})", medir(store, consultas, categoria))
+
+    store.payload_indexes = CAMPOS_INDICE
+    store._ensure_payload_indexes()
+    store.wait_until_indexed()
+
+    print("\n⏱️ Com índice keyword em " + ", ".join(CAMPOS_INDICE))
+    imprimir("sem filtro", medir(store, consultas))
+    for categoria in CATEGORIAS:
+        imprimir(f"category = {categoria} ({CATEGORIAS[categoria]:.0%})", medir(store, consultas, categoria))
+
+    if not args.manter:
+        client.delete_collection(args.colecao)
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Migração - Aplica o armazenamento do RAG_CONFIG a uma coleção existente
+Leva vetores e payload (vectors_on_disk / payload_on_disk / hnsw_on_disk e a
+quantização) para a configuração atual SEM re-embedar os documentos.
+
+Modos:
+  --no-lugar  só update_collection (rápido; o Qdrant regrava os segmentos em
+              segundo plano, mas on_disk_payload vale apenas para segmentos novos);
+  (padrão)    cópia completa: coleção temporária com a configuração nova,
+              recria a original e copia os pontos de volta (ids, vetores e
+              payload preservados). Precisa de espaço em disco para a cópia.
+
+Uso: python rag/utils/migrar_colecao.py [--colecao rag_collection] [--lote 256] [--no-lugar]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Adiciona o diretório raiz ao path
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from rag.rag_config import RAG_CONFIG  # noqa: E402
+from rag.rag_module import create_qdrant_client, create_qdrant_store  # noqa: E402
+
+
+def dimensao(client, colecao: str) -> int:
+    vetores = client.get_collection(colecao).config.params.vectors
+    if isinstance(vetores, dict):
+        raise SystemExit(f"❌ '{colecao}' usa vetores nomeados; a migração só cobre o vetor padrão.")
+    return vetores.size
+
+
+def copiar(client, origem: str, destino, lote: int) -> int:
+    """Copia todos os pontos (com vetores) de `origem` para o store `destino`."""
+    total, offset = 0, None
+    while True:
+        pontos, offset = client.scroll(
+            collection_name=origem,
+            limit=lote,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if pontos:
+            destino.upsert(
+                [p.id for p in pontos],
+                np.asarray([p.vector for p in pontos], dtype=np.float32),
+                [p.payload or {} for p in pontos],
+            )
+            total += len(pontos)
+            print(f"\r📤 {total} pontos copiados", end="", flush=True)
+        if offset is None:
+            break
+    print()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--colecao", default="rag_collection")
+    parser.add_argument("--lote", type=int, default=256)
+    parser.add_argument("--no-lugar", action="store_true", help="Só update_collection, sem copiar")
+    args = parser.parse_args()
+
+    client = create_qdrant_client()
+    if not client.collection_exists(args.colecao):
+        raise SystemExit(f"❌ Coleção '{args.colecao}' não existe.")
+    dim = dimensao(client, args.colecao)
+    print(
+        "⚙️ Alvo: vetores em disco={vectors_on_disk}, payload em disco={payload_on_disk}, "
+        "HNSW em disco={hnsw_on_disk}, quantização={quantization}".format(
+            **{k: RAG_CONFIG.get(k) for k in ("vectors_on_disk", "payload_on_disk", "hnsw_on_disk", "quantization")}
+        )
+    )
+
+    store = create_qdrant_store(client, args.colecao)
+    if store.embedded:
+        print("⚠️ Qdrant embutido: armazenamento e quantização são ignorados; nada a migrar.")
+        client.close()
+        return
+
+    if args.no_lugar:
+        store.ensure(dim)
+        print("✅ Configuração aplicada; o otimizador do Qdrant termina a conversão em segundo plano.")
+        client.close()
+        return
+
+    original = client.count(args.colecao, exact=True).count
+    temporaria = f"{args.colecao}__migracao"
+    if client.collection_exists(temporaria):
+        client.delete_collection(temporaria)
+
+    print(f"📦 1/2 '{args.colecao}' → '{temporaria}' ({original} pontos)")
+    temp = create_qdrant_store(client, temporaria, verbose=False)
+    temp.ensure(dim)
+    copiados = copiar(client, args.colecao, temp, args.lote)
+    if copiados != original or temp.count() != original:
+        raise SystemExit(f"❌ Cópia incompleta ({copiados}/{original}); original mantida, temporária em '{temporaria}'.")
+
+    print(f"📦 2/2 recriando '{args.colecao}' com a configuração atual")
+    client.delete_collection(args.colecao)
+    store.ensure(dim)
+    copiados = copiar(client, temporaria, store, args.lote)
+    if copiados != original or store.count() != original:
+        raise SystemExit(f"❌ Cópia incompleta ({copiados}/{original}); os dados continuam em '{temporaria}'.")
+
+    client.delete_collection(temporaria)
+    print(f"✅ '{args.colecao}' migrada ({original} pontos, sem re-embedar).")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Relatório - Quantização no Qdrant (recall x latência x memória)
+Embeda os chunks da base de conhecimento (mesmo modelo/chunking do RAG),
+opcionalmente replica com ruído para simular uma base maior, e compara os
+modos de RAG_CONFIG["quantization"] contra a busca exata (NumPy):
+  - recall@k em relação ao top-k exato;
+  - latência p50/p95 da busca;
+  - RAM estimada dos vetores usados na busca.
+
+O Qdrant só monta o índice (e usa os vetores quantizados) acima de ~20 mil
+vetores por segmento; use --replicar para chegar lá.
+
+Uso: python rag/utils/relatorio_quantizacao.py [--replicar 200] [--top-k 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Adiciona o diretório raiz ao path
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from rag.rag_chunker import iter_file_chunks  # noqa: E402
+from rag.rag_config import RAG_CONFIG  # noqa: E402
+from rag.rag_module import create_qdrant_client, get_embedding_model, qdrant_mode  # noqa: E402
+from rag.rag_store import QdrantStore  # noqa: E402
+
+# (rótulo, quantização, rescore, oversampling)
+MODOS = [
+    ("float32 (sem quantização)", "none", False, 1.0),
+    ("scalar int8", "scalar", False, 1.0),
+    ("scalar int8 + rescore x2", "scalar", True, 2.0),
+    ("binary", "binary", False, 1.0),
+    ("binary + rescore x3", "binary", True, 3.0),
+]
+
+PERGUNTAS = [
+    "Como redefinir minha senha?",
+    "O sistema está lento, o que fazer?",
+    "Cliente muito irritado com atraso na entrega",
+    "Qual a política de reembolso?",
+    "Como configurar autenticação em dois fatores?",
+    "O cliente quer cancelar o contrato",
+]
+
+
+def normalizar(v: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(v, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return (v / normas).astype(np.float32)
+
+
+def carregar_corpus(kb_dir: str, modelo):
+    chunks = []
+    for arquivo in sorted(Path(kb_dir).rglob("*.txt")):
+        chunks.extend(
+            iter_file_chunks(
+                arquivo,
+                chunk_size=RAG_CONFIG.get("chunk_size", 500),
+                chunk_overlap=RAG_CONFIG.get("chunk_overlap", 50),
+                max_seq_length=getattr(modelo, "max_seq_length", None),
+            )
+        )
+    vetores = modelo.encode(chunks, batch_size=32, convert_to_numpy=True, show_progress_bar=False)
+    return chunks, normalizar(np.asarray(vetores, dtype=np.float32))
+
+
+def replicar(vetores: np.ndarray, copias: int, ruido: float, rng: np.random.Generator) -> np.ndarray:
+    """Cópias com ruído gaussiano: vizinhanças parecidas com as do corpus real."""
+    if copias <= 0:
+        return vetores
+    extras = [normalizar(vetores + rng.normal(scale=ruido, size=vetores.shape)) for _ in range(copias)]
+    return np.vstack([vetores, *extras])
+
+
+def ram_vetores_mb(n: int, dim: int, quantizacao: str) -> float:
+    bytes_por_vetor = {"none": 4 * dim, "scalar": dim, "binary": dim / 8}[quantizacao]
+    return n * bytes_por_vetor / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb", default=RAG_CONFIG.get("knowledge_base_dir", "./rag/base_conhecimento"))
+    parser.add_argument("--replicar", type=int, default=200, help="Cópias com ruído de cada chunk")
+    parser.add_argument("--ruido", type=float, default=0.05)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--manter", action="store_true", help="Não apaga as coleções ao final")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    nome_modelo = os.getenv("RAG_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    print(f"🧠 Modelo: {nome_modelo}")
+    modelo = get_embedding_model(nome_modelo)
+
+    chunks, base = carregar_corpus(args.kb, modelo)
+    vetores = replicar(base, args.replicar, args.ruido, rng)
+    n, dim = vetores.shape
+    print(f"📚 {len(chunks)} chunks do corpus → {n} vetores (dim={dim})")
+
+    # Consultas: perguntas fixas + trechos do próprio corpus
+    trechos = [" ".join(c.split()[:12]) for c in rng.choice(chunks, size=min(len(chunks), args.consultas))]
+    textos = (PERGUNTAS + trechos)[: max(args.consultas, len(PERGUNTAS))]
+    consultas = normalizar(np.asarray(modelo.encode(textos, convert_to_numpy=True), dtype=np.float32))
+
+    # Verdade: top-k exato
+    k = args.top_k
+    exato = np.argsort(-(consultas @ vetores.T), axis=1)[:, :k]
+
+    client = create_qdrant_client()
+    resultados = []
+    for i, (rotulo, quantizacao, rescore, oversampling) in enumerate(MODOS):
+        colecao = f"bench_quant_{i}_{quantizacao}"
+        if client.collection_exists(colecao):
+            client.delete_collection(colecao)
+        store = QdrantStore(
+            client,
+            colecao,
+            verbose=False,
+            quantization=quantizacao,
+            quantization_rescore=rescore,
+            quantization_oversampling=oversampling,
+            embedded=qdrant_mode() != "server",
+        )
+        store.ensure(dim)
+        if store.embedded:
+            print("⚠️ Qdrant embutido: a quantização não tem efeito aqui (use QDRANT_MODE=server).")
+        for inicio in range(0, n, args.lote):
+            fim = min(n, inicio + args.lote)
+            store.upsert(list(range(inicio, fim)), vetores[inicio:fim], [{"idx": i} for i in range(inicio, fim)])
+        store.wait_until_indexed()
+
+        acertos, tempos = 0, []
+        for q, verdade in zip(consultas, exato):
+            t0 = time.perf_counter()
+            achados = store.search(q, top_k=k, score_threshold=-1.0)
+            tempos.append((time.perf_counter() - t0) * 1000)
+            acertos += len({p["idx"] for _, p in achados} & set(verdade.tolist()))
+        t = np.asarray(tempos)
+        resultados.append(
+            (rotulo, acertos / (len(consultas) * k), np.percentile(t, 50), np.percentile(t, 95),
+             ram_vetores_mb(n, dim, quantizacao))
+        )
+        print(f"✔ {rotulo}")
+        if not args.manter:
+            client.delete_collection(colecao)
+
+    print(f"\n📊 recall@{k} x latência ({len(consultas)} consultas, {n} vetores)\n")
+    print(f"  {'modo':<28} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'RAM vetores':>12}")
+    for rotulo, recall, p50, p95, ram in resultados:
+        print(f"  {rotulo:<28} {recall:>7.3f} {p50:>8.2f} {p95:>8.2f} {ram:>9.2f} MB")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
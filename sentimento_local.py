@@ -0,0 +1,158 @@
+"""
+Classificador de sentimento local (sem chamada à OpenAI)
+
+Treina uma regressão logística (scikit-learn) sobre embeddings do mesmo
+SentenceTransformer usado pelo RAG, a partir de um pequeno conjunto de
+exemplos de atendimento em PT-BR (opcionalmente ampliado por um arquivo
+.jsonl). Produz o mesmo formato de analisar_sentimento() do app:
+    {"label", "confidence", "emotions", "reason"}
+
+Emoções são estimadas por similaridade com frases-protótipo de cada emoção.
+
+É opt-in (SENTIMENTO_BACKEND=local/hibrido). Com só as frases-semente e um
+modelo de embeddings em inglês (ex.: all-MiniLM-L6-v2) a precisão em PT-BR é
+baixa; fica adequado com um modelo multilíngue (paraphrase-multilingual-*) e
+um .jsonl com algumas centenas de mensagens reais rotuladas. Em "hibrido",
+mensagens abaixo de sentimento_limiar_confianca continuam indo ao LLM.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+# ═══════════════════════════════════════════════════════
+# EXEMPLOS DE TREINO (semente)
+# ═══════════════════════════════════════════════════════
+
+EXEMPLOS_SENTIMENTO = {
+    "positivo": [
+        "Muito obrigado, resolveu meu problema!",
+        "Adorei o atendimento, vocês são ótimos",
+        "Perfeito, funcionou direitinho agora",
+        "Que rapidez, fiquei muito satisfeito",
+        "Excelente, era exatamente o que eu precisava",
+        "Obrigada pela paciência e pela ajuda",
+        "O produto chegou antes do prazo, parabéns",
+        "Gostei muito da solução, valeu mesmo",
+        "Atendimento nota dez, recomendo",
+        "Consegui acessar minha conta, muito bom",
+        "Vocês foram super atenciosos comigo",
+        "Show, deu tudo certo por aqui",
+    ],
+    "neutro": [
+        "Qual o horário de funcionamento da loja?",
+        "Como faço para redefinir minha senha?",
+        "Gostaria de saber o prazo de entrega",
+        "Quais são as formas de pagamento?",
+        "Preciso atualizar meu endereço de cadastro",
+        "Onde encontro a segunda via do boleto?",
+        "Meu pedido é o número 12345",
+        "Vocês entregam no interior?",
+        "Como funciona a política de troca?",
+        "Queria informações sobre a garantia estendida",
+        "Pode me passar o código de rastreamento?",
+        "Ok, vou verificar e retorno",
+    ],
+    "negativo": [
+        "Estou muito irritado, ninguém resolve meu problema",
+        "Pela terceira vez o pedido veio errado, absurdo",
+        "O produto chegou quebrado, que decepção",
+        "Péssimo atendimento, vou reclamar no Procon",
+        "Já faz duas semanas e meu pedido não chegou",
+        "Não consigo acessar minha conta e ninguém ajuda",
+        "Quero cancelar tudo, estou cansado de esperar",
+        "Fui cobrado duas vezes, isso é um roubo",
+        "O sistema está fora do ar de novo, inaceitável",
+        "Estou preocupado, meu dinheiro ainda não foi devolvido",
+        "Que vergonha, prometeram e não cumpriram",
+        "Não aguento mais esse problema na internet",
+    ],
+}
+
+PROTOTIPOS_EMOCOES = {
+    "gratidão": ["Muito obrigado pela ajuda", "Agradeço a atenção de vocês"],
+    "satisfação": ["Fiquei muito satisfeito com a solução", "Deu tudo certo, adorei"],
+    "raiva": ["Estou com muita raiva, isso é um absurdo", "Que ódio, ninguém resolve nada"],
+    "frustração": ["Já tentei de tudo e nada funciona", "Estou cansado de esperar e nada acontece"],
+    "ansiedade": ["Estou preocupado, preciso disso urgente", "Estou nervoso com essa cobrança"],
+    "confusão": ["Não entendi como funciona", "Estou confuso com essas informações"],
+    "decepção": ["Que decepção com esse produto", "Esperava muito mais de vocês"],
+}
+
+# Similaridade mínima (cosseno) para reportar uma emoção
+LIMIAR_EMOCAO = 0.45
+
+
+def _carregar_jsonl(caminho: str) -> Dict[str, List[str]]:
+    """Lê exemplos extras no formato {"texto": "...", "label": "positivo|neutro|negativo"}."""
+    extras: Dict[str, List[str]] = {}
+    with Path(caminho).open("r", encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha:
+                continue
+            item = json.loads(linha)
+            label = str(item.get("label", "")).lower()
+            if label in EXEMPLOS_SENTIMENTO and item.get("texto"):
+                extras.setdefault(label, []).append(str(item["texto"]))
+    return extras
+
+
+class ClassificadorSentimentoLocal:
+    """Regressão logística sobre embeddings de sentença."""
+
+    def __init__(self, embedding_model, caminho_dataset: Optional[str] = None):
+        self.embedding_model = embedding_model
+
+        exemplos = {k: list(v) for k, v in EXEMPLOS_SENTIMENTO.items()}
+        if caminho_dataset and Path(caminho_dataset).exists():
+            for label, textos in _carregar_jsonl(caminho_dataset).items():
+                exemplos[label].extend(textos)
+
+        textos, labels = [], []
+        for label, itens in exemplos.items():
+            textos.extend(itens)
+            labels.extend([label] * len(itens))
+
+        self.modelo = LogisticRegression(max_iter=1000, class_weight="balanced")
+        self.modelo.fit(self._embed(textos), labels)
+        self.n_exemplos = len(textos)
+
+        # Centróide (normalizado) de cada emoção
+        self._emocoes = list(PROTOTIPOS_EMOCOES)
+        centroides = [self._embed(PROTOTIPOS_EMOCOES[e]).mean(axis=0) for e in self._emocoes]
+        centroides = np.vstack(centroides)
+        self._centroides = centroides / np.linalg.norm(centroides, axis=1, keepdims=True)
+
+    def _embed(self, textos: List[str]) -> np.ndarray:
+        vetores = np.asarray(
+            self.embedding_model.encode(textos, convert_to_numpy=True, show_progress_bar=False),
+            dtype=np.float32,
+        )
+        normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        return vetores / normas
+
+    def classificar(self, texto: str) -> Dict:
+        vetor = self._embed([texto.strip()])
+        probs = self.modelo.predict_proba(vetor)[0]
+        melhor = int(np.argmax(probs))
+        label = str(self.modelo.classes_[melhor])
+        conf = float(probs[melhor])
+
+        sims = self._centroides @ vetor[0]
+        ordem = np.argsort(-sims)[:3]
+        emocoes = [self._emocoes[i] for i in ordem if sims[i] >= LIMIAR_EMOCAO]
+
+        detalhes = ", ".join(
+            f"{c}: {p:.0%}" for c, p in zip(self.modelo.classes_, probs)
+        )
+        return {
+            "label": label,
+            "confidence": round(conf, 3),
+            "emotions": emocoes,
+            "reason": f"Classificador local (embeddings + regressão logística) — {detalhes}",
+        }
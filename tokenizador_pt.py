@@ -0,0 +1,193 @@
+"""
+Tokenização PT-BR (WordCloud, grafo e sketches de vocabulário)
+
+- Regex pré-compilada e stopwords em frozenset;
+- Remoção de acentos opcional (str.translate com tabela pronta);
+- Stemmer leve (plurais e sufixos comuns) com cache por palavra;
+- tokenize_many(): lote de textos, opcionalmente em um pool de processos
+  (ex.: importação de transcrições antigas).
+
+Com as opções padrão, tokenizar() produz exatamente os mesmos tokens do
+tokenize_pt original do app.
+
+Benchmark: python utils/bench_tokenizador.py
+"""
+
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Iterable, List, Optional
+
+_TOKEN_RE = re.compile(r"[a-zA-ZÀ-ÿ]+")
+_findall = _TOKEN_RE.findall
+
+TAMANHO_MINIMO = 3
+
+STOPWORDS_PT = frozenset({
+    "a",
+    "à",
+    "às",
+    "ao",
+    "aos",
+    "as",
+    "o",
+    "os",
+    "um",
+    "uma",
+    "uns",
+    "umas",
+    "de",
+    "da",
+    "do",
+    "das",
+    "dos",
+    "dá",
+    "dão",
+    "em",
+    "no",
+    "na",
+    "nos",
+    "nas",
+    "por",
+    "para",
+    "pra",
+    "com",
+    "sem",
+    "entre",
+    "sobre",
+    "sob",
+    "até",
+    "após",
+    "que",
+    "se",
+    "é",
+    "ser",
+    "são",
+    "era",
+    "eram",
+    "foi",
+    "fui",
+    "vai",
+    "vou",
+    "e",
+    "ou",
+    "mas",
+    "como",
+    "quando",
+    "onde",
+    "qual",
+    "quais",
+    "porque",
+    "porquê",
+    "já",
+    "não",
+    "sim",
+    "também",
+    "mais",
+    "menos",
+    "muito",
+    "muita",
+    "muitos",
+    "muitas",
+    "meu",
+    "minha",
+    "meus",
+    "minhas",
+    "seu",
+    "sua",
+    "seus",
+    "suas",
+    "depois",
+    "antes",
+    "este",
+    "esta",
+    "estes",
+    "estas",
+    "isso",
+    "isto",
+    "aquele",
+    "aquela",
+    "aqueles",
+    "aquelas",
+    "lhe",
+    "lhes",
+    "ele",
+    "ela",
+    "eles",
+    "elas",
+    "você",
+    "vocês",
+    "nós",
+    "nosso",
+    "nossa",
+    "nossos",
+    "nossas",
+})
+
+# Tabela para str.translate: letra acentuada -> letra base (ç -> c, ã -> a, ...)
+_SEM_ACENTO = {
+    c: unicodedata.normalize("NFD", chr(c))[0]
+    for c in range(0xC0, 0x100)
+    if unicodedata.normalize("NFD", chr(c))[0] != chr(c)
+}
+
+# Sufixos do stemmer leve, do mais longo para o mais curto: (sufixo, troca, tamanho mínimo do radical)
+_SUFIXOS = (
+    ("amente", "", 4),
+    ("mente", "", 4),
+    ("ões", "ão", 2),
+    ("ães", "ão", 2),
+    ("ãos", "ão", 2),
+    ("ais", "al", 2),
+    ("éis", "el", 2),
+    ("eis", "el", 2),
+    ("óis", "ol", 2),
+    ("res", "r", 2),
+    ("zes", "z", 2),
+    ("les", "l", 2),
+    ("ns", "m", 2),
+    ("s", "", 3),
+)
+
+
+@lru_cache(maxsize=65536)
+def radical(palavra: str) -> str:
+    """Stemmer leve: reduz plural e advérbios em -mente (ex.: "pedidos" -> "pedido")."""
+    for sufixo, troca, minimo in _SUFIXOS:
+        if palavra.endswith(sufixo) and len(palavra) - len(sufixo) >= minimo:
+            return palavra[: -len(sufixo)] + troca
+    return palavra
+
+
+def remover_acentos(texto: str) -> str:
+    return texto.translate(_SEM_ACENTO)
+
+
+def tokenizar(texto: str, remover_acento: bool = False, stem: bool = False) -> List[str]:
+    """Tokens em minúsculas, sem stopwords e com pelo menos 3 letras."""
+    tokens = [t for t in _findall(texto.lower()) if len(t) >= TAMANHO_MINIMO and t not in STOPWORDS_PT]
+    # Stem antes de tirar acentos: os sufixos (ões, éis, ...) dependem deles
+    if stem:
+        tokens = [radical(t) for t in tokens]
+    if remover_acento:
+        tokens = [t.translate(_SEM_ACENTO) for t in tokens]
+    return tokens
+
+
+def tokenize_many(
+    textos: Iterable[str],
+    processos: Optional[int] = None,
+    chunksize: int = 256,
+    remover_acento: bool = False,
+    stem: bool = False,
+) -> List[List[str]]:
+    """
+    Tokeniza vários textos. Com `processos` > 1 usa um ProcessPoolExecutor
+    (vale a pena só para lotes grandes: há custo de iniciar os processos).
+    """
+    func = partial(tokenizar, remover_acento=remover_acento, stem=stem)
+    if processos and processos > 1:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            return list(pool.map(func, textos, chunksize=max(1, int(chunksize))))
+    return [func(t) for t in textos]
@@ -0,0 +1,84 @@
+"""
+Microbenchmark - Tokenizador PT-BR
+Compara a vazão (tokens/s) do tokenize_pt original do app com o
+tokenizador_pt (padrão, com acentos removidos + stemmer, e em lote).
+
+Uso: python utils/bench_tokenizador.py [--mensagens 50000] [--processos 4]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tokenizador_pt import STOPWORDS_PT, tokenize_many, tokenizar  # noqa: E402
+
+_PT_STOPWORDS = set(STOPWORDS_PT)
+
+
+def tokenize_pt_original(texto: str):
+    """Implementação anterior do app (referência)."""
+    texto = texto.lower()
+    tokens = re.findall(r"[a-zA-ZÀ-ÿ]+", texto)
+    tokens = [t for t in tokens if len(t) >= 3 and t not in _PT_STOPWORDS]
+    return tokens
+
+
+def gerar_mensagens(n: int, seed: int = 42):
+    """Mensagens sintéticas a partir dos textos da base de conhecimento."""
+    base = Path(__file__).resolve().parent.parent / "rag" / "base_conhecimento"
+    palavras = []
+    for arquivo in base.rglob("*.txt"):
+        palavras.extend(arquivo.read_text(encoding="utf-8").split())
+    if not palavras:
+        palavras = "Olá não consigo acessar minha conta desde ontem, pedido atrasado".split()
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(palavras, k=rng.randint(5, 40))) for _ in range(n)]
+
+
+def medir(nome, func, mensagens, repeticoes=3):
+    melhor = float("inf")
+    total = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func(mensagens)
+        melhor = min(melhor, time.perf_counter() - inicio)
+        total = sum(len(t) for t in resultado)
+    print(f"{nome:<38} {total / melhor:>14,.0f} tokens/s   ({melhor * 1000:8.1f} ms)")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mensagens", type=int, default=50_000)
+    parser.add_argument("--processos", type=int, default=4)
+    args = parser.parse_args()
+
+    mensagens = gerar_mensagens(args.mensagens)
+    print(f"📊 {len(mensagens)} mensagens\n")
+
+    ref = medir("tokenize_pt (original)", lambda ms: [tokenize_pt_original(m) for m in ms], mensagens)
+    novo = medir("tokenizar (padrão)", lambda ms: [tokenizar(m) for m in ms], mensagens)
+    medir("tokenize_many (padrão)", tokenize_many, mensagens)
+    medir(
+        "tokenize_many (sem acento + stem)",
+        lambda ms: tokenize_many(ms, remover_acento=True, stem=True),
+        mensagens,
+    )
+    if args.processos > 1:
+        medir(
+            f"tokenize_many ({args.processos} processos)",
+            lambda ms: tokenize_many(ms, processos=args.processos, chunksize=1024),
+            mensagens,
+            repeticoes=1,
+        )
+
+    print("\n✅ Saída idêntica ao original" if ref == novo else "\n❌ Saída diferente do original")
+
+
+if __name__ == "__main__":
+    main()
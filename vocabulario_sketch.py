@@ -0,0 +1,156 @@
+"""
+Estatísticas de vocabulário com memória fixa (sketches)
+
+- CountMinSketch: estimativa de frequência de qualquer palavra com erro
+  limitado: superestima no máximo epsilon * total, com probabilidade 1 - delta.
+- SpaceSaving: mantém os k candidatos a mais frequentes (heavy hitters).
+- TopKVocabulario: combina os dois; é o que o app alimenta a cada mensagem.
+
+Todos suportam merge: sketches por sessão podem ser somados em um global,
+desde que criados com os mesmos parâmetros (epsilon, delta, seed).
+"""
+
+import hashlib
+import math
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+class CountMinSketch:
+    """Count-Min sketch (tabela depth x width de contadores)."""
+
+    def __init__(self, epsilon: float = 0.001, delta: float = 0.01, seed: int = 0):
+        self.epsilon = float(epsilon)
+        self.delta = float(delta)
+        self.seed = int(seed)
+        self.width = int(math.ceil(math.e / self.epsilon))
+        self.depth = int(math.ceil(math.log(1.0 / self.delta)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+        self._salt = self.seed.to_bytes(8, "little", signed=True)
+
+    def _indices(self, itens: List[str]) -> np.ndarray:
+        """Colunas de cada item em cada linha (double hashing, estável entre processos)."""
+        h = np.empty((2, len(itens)), dtype=np.uint64)
+        for i, item in enumerate(itens):
+            d = hashlib.blake2b(item.encode("utf-8"), digest_size=16, salt=self._salt).digest()
+            h[0, i] = int.from_bytes(d[:8], "little")
+            h[1, i] = int.from_bytes(d[8:], "little") | 1
+        linhas = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h[0] + linhas * h[1]) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, itens: Iterable[str], contagem: int = 1):
+        itens = list(itens)
+        if not itens:
+            return
+        cols = self._indices(itens)
+        for linha in range(self.depth):
+            np.add.at(self.table[linha], cols[linha], contagem)
+        self.total += contagem * len(itens)
+
+    def estimate(self, item: str) -> int:
+        cols = self._indices([item])[:, 0]
+        return int(self.table[np.arange(self.depth), cols].min())
+
+    def merge(self, other: "CountMinSketch"):
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("CountMinSketch com parâmetros diferentes não podem ser mesclados")
+        self.table += other.table
+        self.total += other.total
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.table.nbytes)
+
+
+class SpaceSaving:
+    """
+    Algoritmo Space-Saving: no máximo k contadores. Um item novo com a
+    estrutura cheia substitui o de menor contagem e herda essa contagem
+    como erro (contagem real >= count - error).
+    """
+
+    def __init__(self, k: int = 200):
+        self.k = int(k)
+        self.counters: Dict[str, List[int]] = {}  # item -> [count, error]
+
+    def update(self, itens: Iterable[str]):
+        for item in itens:
+            c = self.counters.get(item)
+            if c is not None:
+                c[0] += 1
+            elif len(self.counters) < self.k:
+                self.counters[item] = [1, 0]
+            else:
+                menor = min(self.counters, key=lambda x: self.counters[x][0])
+                m = self.counters.pop(menor)[0]
+                self.counters[item] = [m + 1, m]
+
+    def min_count(self) -> int:
+        if len(self.counters) < self.k:
+            return 0
+        return min(c[0] for c in self.counters.values())
+
+    def merge(self, other: "SpaceSaving"):
+        """Merge de resumos (itens ausentes em um lado recebem o mínimo dele como erro)."""
+        m1, m2 = self.min_count(), other.min_count()
+        juntos: Dict[str, List[int]] = {}
+        for item in set(self.counters) | set(other.counters):
+            a = self.counters.get(item, [m1, m1])
+            b = other.counters.get(item, [m2, m2])
+            juntos[item] = [a[0] + b[0], a[1] + b[1]]
+        top = sorted(juntos.items(), key=lambda kv: -kv[1][0])[: self.k]
+        self.counters = dict(top)
+
+    def top(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """[(item, contagem, erro)] ordenado por contagem."""
+        itens = sorted(self.counters.items(), key=lambda kv: (-kv[1][0], kv[0]))
+        return [(item, c, e) for item, (c, e) in itens[:n]]
+
+
+class TopKVocabulario:
+    """Top-K de palavras com memória fixa, thread-safe e mesclável."""
+
+    def __init__(self, k: int = 200, epsilon: float = 0.001, delta: float = 0.01, seed: int = 0):
+        self.k = int(k)
+        self.cms = CountMinSketch(epsilon=epsilon, delta=delta, seed=seed)
+        self.heavy = SpaceSaving(k=k)
+        self._lock = threading.Lock()
+
+    def update(self, tokens: Iterable[str]):
+        tokens = list(tokens)
+        with self._lock:
+            self.cms.update(tokens)
+            self.heavy.update(tokens)
+
+    def merge(self, other: "TopKVocabulario"):
+        with self._lock:
+            self.cms.merge(other.cms)
+            self.heavy.merge(other.heavy)
+
+    def estimate(self, token: str) -> int:
+        with self._lock:
+            return self.cms.estimate(token)
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Candidatos do Space-Saving ordenados pela estimativa (mais justa) do Count-Min."""
+        with self._lock:
+            candidatos = [item for item, _, _ in self.heavy.top(self.k)]
+            estimados = [(item, self.cms.estimate(item)) for item in candidatos]
+        estimados.sort(key=lambda kv: (-kv[1], kv[0]))
+        return estimados[:n]
+
+    @property
+    def total(self) -> int:
+        return self.cms.total
+
+    def get_stats(self) -> Dict:
+        return {
+            "total_tokens": self.total,
+            "k": self.k,
+            "erro_maximo": int(math.ceil(self.cms.epsilon * self.total)),
+            "confianca": 1 - self.cms.delta,
+            "memoria_bytes": self.cms.nbytes,
+        }